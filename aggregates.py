@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from normalization import abbreviate_universities, normalize_facultes, UNKNOWN_UNIVERSITY
+
+# Cube d'agrégats : nombre de personnes pour chaque combinaison de ces dimensions.
+# Toutes les statistiques de show_statistics s'en déduisent par filtrage et somme,
+# sans repasser sur les lignes brutes.
+CUBE_DIMENSIONS = ['genre', 'niveau_etude', 'universite', 'universite_abrev', 'ville', 'faculte', 'statut']
+
+def cube_dimensions(df):
+    """Valeur de chaque dimension du cube pour chaque ligne"""
+    # Facultés vides ou nulles exclues des statistiques par faculté (NaN dans le cube)
+    faculte = df['faculte']
+    has_faculte = faculte.notna() & (faculte != "")
+    return pd.DataFrame({
+        'genre': df['genre'],
+        'niveau_etude': df['niveau_etude'],
+        'universite': df['universite'],
+        'universite_abrev': abbreviate_universities(df['universite']),
+        'ville': df['ville'],
+        'faculte': normalize_facultes(faculte.astype(object).where(has_faculte)).where(has_faculte),
+        'statut': df['statut'] if 'statut' in df.columns else None
+    }, index=df.index)
+
+def build_cube(df):
+    """Calcule le cube en une seule passe sur les lignes"""
+    return cube_dimensions(df).groupby(CUBE_DIMENSIONS, dropna=False, observed=True, sort=False).size().reset_index(name='count')
+
+def patch_cube(cube, change):
+    """Cube du jeu de données modifié (voir data_cache.FrameChange), à partir des seules lignes touchées :
+    les anciennes versions des lignes sont décomptées, les nouvelles comptées"""
+    old = change.before.iloc[np.concatenate([change.updated, change.removed])]
+    new = change.after.iloc[change.written]
+    delta = pd.concat([
+        cube_dimensions(old).assign(count=-1),
+        cube_dimensions(new).assign(count=1)
+    ], ignore_index=True)
+    cube = pd.concat([cube, delta], ignore_index=True)
+    cube = cube.groupby(CUBE_DIMENSIONS, dropna=False, observed=True, sort=False)['count'].sum().reset_index()
+    return cube[cube['count'] > 0].reset_index(drop=True)
+
+def slice_cube(cube, filters):
+    """Garde les cellules dont chaque dimension filtrée prend une des valeurs choisies"""
+    mask = pd.Series(True, index=cube.index)
+    for column, values in filters.items():
+        if values:
+            mask &= cube[column].isin(values)
+    return cube[mask]
+
+def _valid(values):
+    return values.notna() & (values != "") & (values != "nan")
+
+def counts_by(cube, column):
+    """Nombre de personnes par valeur de `column`, par ordre décroissant (comme value_counts)"""
+    counts = cube.groupby(column, observed=True)['count'].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    return counts.rename_axis(column).reset_index()
+
+def total(cube):
+    return int(cube['count'].sum())
+
+def count_genre(cube, genre):
+    return int(cube.loc[cube['genre'] == genre, 'count'].sum())
+
+def count_universities(cube):
+    # Compter uniquement les universités non vides
+    return cube.loc[_valid(cube['universite']), 'universite'].nunique()
+
+def niveau_counts(cube):
+    # Supprimer les niveaux d'étude vides ou nuls
+    return counts_by(cube[_valid(cube['niveau_etude'])], 'niveau_etude')
+
+def university_counts(cube):
+    # Supprimer les universités vides, puis celles abrégées en "Inconnu"
+    cube = cube[_valid(cube['universite']) & (cube['universite_abrev'] != UNKNOWN_UNIVERSITY)]
+    return counts_by(cube, 'universite_abrev').rename(columns={'universite_abrev': 'universite'})
+
+def faculty_stats(cube):
+    """Effectifs par faculté normalisée, avec la répartition hommes / femmes"""
+    cube = cube[cube['faculte'].notna()]
+    hommes = cube['count'].where(cube['genre'] == 'Homme', 0)
+    fac_stats = pd.DataFrame({
+        'faculte': cube['faculte'],
+        'Nombre total': cube['count'],
+        'Nombre d\'hommes': hommes
+    }).groupby('faculte').sum()
+    fac_stats['Nombre de femmes'] = fac_stats['Nombre total'] - fac_stats['Nombre d\'hommes']
+    fac_stats['Pourcentage d\'hommes'] = (fac_stats['Nombre d\'hommes'] / fac_stats['Nombre total'] * 100).round(1)
+    fac_stats['Pourcentage de femmes'] = (fac_stats['Nombre de femmes'] / fac_stats['Nombre total'] * 100).round(1)
+    return fac_stats
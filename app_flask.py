@@ -1,43 +1,163 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
 import mysql.connector
-import pandas as pd
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from mysql.connector import pooling
 import os
+import io
+import csv
 import json
+import zlib
+import threading
+import time
+
+# pandas, le client Google, la normalisation et le rapprochement ne servent qu'à
+# la synchronisation et au repli sur l'instantané : ils sont importés à l'usage
+# pour accélérer le démarrage des workers.
+from snapshot import SNAPSHOT_PATH, load_snapshot
+import metrics
 
 app = Flask(__name__)
 
+# Nombre de lignes envoyées par requête lors de la synchronisation
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "500"))
+
+SYNC_COLUMNS = ['nom_complet', 'email', 'genre', 'universite', 'faculte',
+                'niveau_etude', 'telephone', 'adresse', 'ville']
+
+# Insertion multi-lignes ; les emails déjà présents (clé unique) sont mis à jour
+SYNC_QUERY = """
+INSERT INTO etudiants
+(nom_complet, email, genre, universite, faculte, niveau_etude,
+ telephone, adresse, ville, date_inscription, date_modification)
+VALUES {placeholders}
+ON DUPLICATE KEY UPDATE
+    nom_complet = VALUES(nom_complet), genre = VALUES(genre),
+    universite = VALUES(universite), faculte = VALUES(faculte),
+    niveau_etude = VALUES(niveau_etude), telephone = VALUES(telephone),
+    adresse = VALUES(adresse), ville = VALUES(ville), date_modification = NOW()
+"""
+SYNC_ROW_PLACEHOLDER = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, CURDATE(), NOW())"
+
+# Pagination de /api/etudiants
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+ETUDIANT_COLUMNS = ['id', 'date_inscription', 'email', 'nom_complet', 'genre', 'universite',
+                    'faculte', 'niveau_etude', 'telephone', 'adresse', 'ville',
+                    'date_creation', 'date_modification']
+# Colonnes filtrables par égalité (?genre=Homme) ou par IN (?genre=Homme&genre=Femme)
+FILTER_COLUMNS = ['genre', 'ville', 'universite', 'niveau_etude']
+
+# Nombre de lignes lues à la fois lors d'un export
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
 # Configuration de la base de données
+DB_CONFIG = {
+    'host': os.getenv('MYSQL_HOST', 'localhost'),
+    'port': int(os.getenv('MYSQL_PORT', '3306')),
+    'user': os.getenv('MYSQL_USER', 'root'),
+    'password': os.getenv('MYSQL_PASSWORD', ''),
+    'database': os.getenv('MYSQL_DATABASE', 'cirt_db')
+}
+# Taille du pool (32 au maximum pour mysql.connector) et attente maximale d'une connexion libre
+DB_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT', '5'))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Dernier instantané lu (repli quand la base est injoignable)
+_snapshot = {'mtime': None, 'df': None}
+_snapshot_lock = threading.Lock()
+
+def pool_connections_in_use():
+    # mysql.connector n'expose pas l'occupation du pool : connexions absentes de sa file
+    if _pool is None:
+        return None
+    return _pool.pool_size - _pool._cnx_queue.qsize()
+
+# Métriques exposées sur /metrics (propres à chaque processus)
+METRICS = metrics.Registry()
+REQUEST_LATENCY = METRICS.histogram(
+    'cirt_http_request_duration_seconds', "Durée de traitement des requêtes HTTP",
+    ['method', 'endpoint', 'status']
+)
+DB_QUERY_LATENCY = METRICS.histogram(
+    'cirt_db_query_duration_seconds', "Durée des requêtes MySQL", ['query']
+)
+DB_POOL_WAIT = METRICS.histogram(
+    'cirt_db_pool_wait_seconds', "Attente d'une connexion libre dans le pool"
+)
+DB_CONNECTION_ERRORS = METRICS.counter(
+    'cirt_db_connection_errors_total', "Connexions à la base impossibles (pool épuisé, serveur injoignable)"
+)
+METRICS.gauge('cirt_db_pool_size', "Taille du pool de connexions MySQL", function=lambda: DB_POOL_SIZE)
+METRICS.gauge('cirt_db_pool_in_use', "Connexions du pool actuellement empruntées", function=pool_connections_in_use)
+SNAPSHOT_FALLBACKS = METRICS.counter(
+    'cirt_snapshot_fallback_total', "Réponses servies depuis l'instantané local", ['endpoint']
+)
+SYNC_ROWS = METRICS.counter(
+    'cirt_sync_rows_total', "Lignes de la feuille traitées par /api/sync", ['result']
+)
+SYNC_RUNS = METRICS.counter(
+    'cirt_sync_runs_total', "Synchronisations par issue", ['outcome']
+)
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='cirt_pool',
+                    pool_size=DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **DB_CONFIG
+                )
+    return _pool
+
 def get_db_connection():
+    """Emprunte une connexion au pool ; conn.close() la rend au pool"""
+    deadline = time.monotonic() + DB_POOL_TIMEOUT
     try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",
-            database="cirt_db"
-        )
+        with DB_POOL_WAIT.time():
+            while True:
+                try:
+                    conn = get_pool().get_connection()
+                    break
+                except mysql.connector.errors.PoolError:
+                    # Pool épuisé : attendre qu'une connexion soit rendue
+                    if time.monotonic() >= deadline:
+                        raise
+                    time.sleep(0.05)
+        # Vérification de santé : reconnexion si le serveur a fermé la connexion
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=0)
+        except mysql.connector.Error:
+            conn.close()
+            raise
         return conn
     except mysql.connector.Error as err:
+        DB_CONNECTION_ERRORS.inc()
         print(f"Erreur de connexion à la base de données: {err}")
         return None
 
-# Fonction pour normaliser le genre
-def normalize_genre(genre):
-    if pd.isna(genre):
-        return 'Autre'
-    genre = str(genre).strip().upper()
-    if genre in ['M', 'HOMME', 'H', 'MALE']:
-        return 'Homme'
-    elif genre in ['F', 'FEMME', 'FEMALE']:
-        return 'Femme'
-    else:
-        return 'Autre'
+def execute(cursor, name, query, params=None):
+    """cursor.execute mesuré dans cirt_db_query_duration_seconds{query=name}"""
+    with DB_QUERY_LATENCY.time(query=name):
+        cursor.execute(query, params)
 
 # Fonction pour charger depuis Google Sheets
 def load_from_google_sheets(sheet_id):
+    import pandas as pd
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+    from googleapiclient.discovery import build
+    from normalization import normalize_genres
+    
     try:
         SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
         creds = None
@@ -68,7 +188,7 @@ def load_from_google_sheets(sheet_id):
             
         df = pd.DataFrame(values[1:], columns=values[0])
         df.columns = df.columns.str.lower().str.replace(' ', '_')
-        df['genre'] = df['genre'].apply(normalize_genre)
+        df['genre'] = normalize_genres(df['genre'])
         
         return df
         
@@ -76,96 +196,360 @@ def load_from_google_sheets(sheet_id):
         print(f"Erreur lors du chargement depuis Google Sheets: {str(e)}")
         return None
 
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Route plutôt que chemin : une série par point d'accès, quels que soient les paramètres
+        endpoint = request.url_rule.rule if request.url_rule else 'inconnu'
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method, endpoint=endpoint, status=response.status_code
+        )
+    return response
+
+@app.route('/metrics')
+def get_metrics():
+    return Response(METRICS.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def parse_int_arg(name, default, minimum=0, maximum=None):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise ValueError(f"Paramètre '{name}' invalide")
+    if value < minimum:
+        raise ValueError(f"Paramètre '{name}' invalide")
+    return min(value, maximum) if maximum is not None else value
+
+def parse_etudiants_args():
+    """Renvoie (colonnes, after_id, filtres, limit) à partir des paramètres de l'URL"""
+    limit = parse_int_arg('limit', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    after_id = parse_int_arg('after_id', 0)
+    
+    fields = request.args.get('fields')
+    if fields:
+        columns = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [column for column in columns if column not in ETUDIANT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(unknown)}")
+        # L'id sert de curseur pour la page suivante
+        if 'id' not in columns:
+            columns.insert(0, 'id')
+    else:
+        columns = ETUDIANT_COLUMNS
+    
+    filters = {column: request.args.getlist(column) for column in FILTER_COLUMNS if request.args.getlist(column)}
+    return columns, after_id, filters, limit
+
+def build_etudiants_query(columns, after_id, filters, limit):
+    """Construit la requête paginée (keyset sur id)"""
+    conditions = ["id > %s"]
+    params = [after_id]
+    for column, values in filters.items():
+        if len(values) == 1:
+            conditions.append(f"{column} = %s")
+        elif values:
+            conditions.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+        params.extend(values)
+    
+    query = (
+        f"SELECT {', '.join(columns)} FROM etudiants "
+        f"WHERE {' AND '.join(conditions)} ORDER BY id LIMIT %s"
+    )
+    params.append(limit)
+    return query, params
+
+def get_snapshot():
+    """Instantané Parquet écrit par app.py, relu seulement s'il a changé ; None s'il n'existe pas"""
+    try:
+        mtime = os.path.getmtime(SNAPSHOT_PATH)
+    except OSError:
+        return None
+    with _snapshot_lock:
+        if _snapshot['mtime'] != mtime:
+            df, _ = load_snapshot(SNAPSHOT_PATH)
+            _snapshot.update(mtime=mtime, df=df)
+        return _snapshot['df']
+
+def snapshot_page(df, columns, after_id, filters, limit):
+    """Même page que build_etudiants_query, lue dans l'instantané"""
+    rows = df[df['id'] > after_id]
+    for column, values in filters.items():
+        rows = rows[rows[column].astype(str).isin(values)]
+    rows = rows.sort_values('id').head(limit).reindex(columns=columns)
+    return json.loads(rows.to_json(orient='records', date_format='iso', force_ascii=False))
+
+def conditional_json(payload, from_snapshot=False):
+    response = jsonify(payload)
+    if from_snapshot:
+        # Base injoignable : données de l'instantané local, éventuellement en retard
+        response.headers['X-Data-Source'] = 'snapshot'
+    # ETag calculé sur le contenu : une réponse inchangée renvoie 304 sans corps
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/api/etudiants')
 def get_etudiants():
+    try:
+        columns, after_id, filters, limit = parse_etudiants_args()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    
     conn = get_db_connection()
     if not conn:
-        return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+        SNAPSHOT_FALLBACKS.inc(endpoint='/api/etudiants')
+        etudiants = snapshot_page(snapshot, columns, after_id, filters, limit)
+        next_after_id = etudiants[-1]['id'] if len(etudiants) == limit else None
+        return conditional_json({'data': etudiants, 'next_after_id': next_after_id}, from_snapshot=True)
     
+    cursor = None
     try:
+        query, params = build_etudiants_query(columns, after_id, filters, limit)
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM etudiants")
+        execute(cursor, 'etudiants_page', query, params)
         etudiants = cursor.fetchall()
-        return jsonify(etudiants)
+        next_after_id = etudiants[-1]['id'] if len(etudiants) == limit else None
+        return conditional_json({'data': etudiants, 'next_after_id': next_after_id})
     except mysql.connector.Error as err:
         return jsonify({'error': str(err)}), 500
     finally:
-        cursor.close()
+        if cursor:
+            cursor.close()
+        conn.close()
+
+def release_once(conn):
+    """Renvoie une fonction qui rend `conn` au pool, sans effet après le premier appel"""
+    lock = threading.Lock()
+    pending = [conn]
+    
+    def release():
+        with lock:
+            if not pending:
+                return
+            try:
+                pending.pop().close()
+            except mysql.connector.Error:
+                # Connexion déjà fermée (export interrompu) : close() échoue sur la
+                # remise à zéro de la session mais la rend tout de même au pool,
+                # qui la rouvrira au prochain emprunt
+                pass
+    return release
+
+def iter_export(conn, export_format, compress, release):
+    """Lit la table par lots (curseur non bufferisé) et produit le fichier morceau par morceau.
+
+    `release` rend la connexion au pool ; elle est aussi appelée à la fermeture
+    de la réponse, car ce générateur ne démarre pas si le corps n'est jamais lu.
+    """
+    cursor = None
+    finished = False
+    # wbits=31 : format gzip
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    try:
+        cursor = conn.cursor(buffered=False)
+        execute(cursor, 'export', f"SELECT {', '.join(ETUDIANT_COLUMNS)} FROM etudiants ORDER BY id")
+        columns = list(cursor.column_names)
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == 'csv':
+            writer.writerow(columns)
+        
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            if export_format == 'csv':
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False))
+                    buffer.write('\n')
+            chunk = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        finished = True
+        
+        if compressor:
+            yield compressor.flush()
+    finally:
+        if cursor and finished:
+            cursor.close()
+        elif cursor:
+            # Téléchargement interrompu (client parti, erreur) : lire le reste de la
+            # table pour vider la connexion coûterait autant que l'export entier.
+            # Elle est fermée à la place, et rouverte par le pool au prochain emprunt.
+            conn.disconnect()
+        release()
+
+@app.route('/api/etudiants/export')
+def export_etudiants():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Format inconnu: {export_format} (ndjson ou csv)"}), 400
+    compress = request.args.get('gzip') in ('1', 'true')
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+    
+    filename = f"etudiants.{export_format}"
+    mimetype = EXPORT_FORMATS[export_format]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    release = release_once(conn)
+    response = Response(
+        stream_with_context(iter_export(conn, export_format, compress, release)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+    # Requête HEAD, client parti avant le premier morceau : le générateur n'a pas démarré
+    response.call_on_close(release)
+    return response
+
+def stats_payload(counts):
+    return {
+        'total': sum(counts.values()),
+        'hommes': counts.get('Homme', 0),
+        'femmes': counts.get('Femme', 0)
+    }
+
+@app.route('/api/stats')
+def get_stats():
+    conn = get_db_connection()
+    if not conn:
+        snapshot = get_snapshot()
+        if snapshot is None:
+            return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
+        SNAPSHOT_FALLBACKS.inc(endpoint='/api/stats')
+        counts = {str(genre): int(count) for genre, count in snapshot['genre'].value_counts().items()}
+        return conditional_json(stats_payload(counts), from_snapshot=True)
+    
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        execute(cursor, 'stats', "SELECT genre, COUNT(*) FROM etudiants GROUP BY genre")
+        return conditional_json(stats_payload(dict(cursor.fetchall())))
+    except mysql.connector.Error as err:
+        return jsonify({'error': str(err)}), 500
+    finally:
+        if cursor:
+            cursor.close()
         conn.close()
 
+def fetch_existing_hashes(cursor):
+    """Empreinte des champs synchronisés de chaque email présent en base"""
+    import pandas as pd
+    from reconcile import HASH_FIELDS, hashes_by_email
+    
+    execute(cursor, 'sync_hashes', f"SELECT email, {', '.join(HASH_FIELDS)} FROM etudiants")
+    rows = []
+    while True:
+        batch = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not batch:
+            break
+        rows.extend(batch)
+    return hashes_by_email(pd.DataFrame(rows, columns=['email'] + HASH_FIELDS))
+
 @app.route('/api/sync', methods=['POST'])
 def sync_data():
     sheet_id = "11ucmdeReXYeAD4phDTJSyq_5ELnADZlUQpDZhH43Gk8"
     df = load_from_google_sheets(sheet_id)
     
     if df is None:
+        SYNC_RUNS.inc(outcome='error')
         return jsonify({'error': 'Erreur lors du chargement des données'}), 500
     
+    # Une colonne absente ou renommée dans la feuille viderait ce champ en base
+    rows = df.rename(columns={'nom': 'nom_complet', 'adresse_e_mail': 'email'})
+    missing_columns = [column for column in SYNC_COLUMNS if column not in rows.columns]
+    if missing_columns:
+        SYNC_RUNS.inc(outcome='error')
+        return jsonify({'error': f"Colonnes absentes de la feuille: {', '.join(missing_columns)}"}), 400
+    
     conn = get_db_connection()
     if not conn:
+        SYNC_RUNS.inc(outcome='error')
         return jsonify({'error': 'Erreur de connexion à la base de données'}), 500
     
+    dry_run = request.args.get('dry_run') in ('1', 'true')
+    from reconcile import reconcile
+    
+    changes = None
+    committed = 0
     try:
         cursor = conn.cursor()
         
-        # Récupérer les emails existants
-        cursor.execute("SELECT email FROM etudiants")
-        existing_emails = set(row[0] for row in cursor.fetchall())
+        # Préparer les lignes de la feuille (une seule ligne par email)
+        rows = rows[rows['email'].notna() & (rows['email'] != '')]
+        rows = rows.drop_duplicates(subset='email', keep='last')
+        rows = rows[SYNC_COLUMNS].astype(object)
+        rows = rows.where(rows.notna(), None)
         
-        new_records = 0
-        updated_records = 0
+        # Seules les lignes nouvelles ou modifiées sont écrites
+        changes = reconcile(rows, fetch_existing_hashes(cursor))
+        records = [
+            record
+            for part in (changes['new'], changes['changed'])
+            for record in part.itertuples(index=False, name=None)
+        ]
         
-        for _, row in df.iterrows():
-            email = row['adresse_e_mail']
-            if pd.isna(email) or email == '':
-                continue
-                
-            if email in existing_emails:
-                # Mise à jour
-                query = """
-                UPDATE etudiants 
-                SET nom_complet = %s, genre = %s, universite = %s, 
-                    faculte = %s, niveau_etude = %s, telephone = %s, 
-                    adresse = %s, ville = %s, date_modification = NOW()
-                WHERE email = %s
-                """
-                values = (
-                    row['nom'], row['genre'], row['universite'],
-                    row['faculte'], row['niveau_etude'], row['telephone'],
-                    row['adresse'], row['ville'], email
-                )
-                cursor.execute(query, values)
-                updated_records += 1
-            else:
-                # Insertion
-                query = """
-                INSERT INTO etudiants 
-                (nom_complet, email, genre, universite, faculte, niveau_etude, 
-                 telephone, adresse, ville, date_inscription, date_modification)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-                """
-                values = (
-                    row['nom'], email, row['genre'], row['universite'],
-                    row['faculte'], row['niveau_etude'], row['telephone'],
-                    row['adresse'], row['ville']
-                )
-                cursor.execute(query, values)
-                new_records += 1
+        if not dry_run:
+            for start in range(0, len(records), SYNC_BATCH_SIZE):
+                batch = records[start:start + SYNC_BATCH_SIZE]
+                query = SYNC_QUERY.format(placeholders=", ".join([SYNC_ROW_PLACEHOLDER] * len(batch)))
+                execute(cursor, 'sync_upsert', query, [value for record in batch for value in record])
+                # Une transaction courte par lot plutôt qu'une seule pour toute la feuille
+                conn.commit()
+                committed += len(batch)
         
-        conn.commit()
+        SYNC_RUNS.inc(outcome='dry_run' if dry_run else 'success')
+        if not dry_run:
+            SYNC_ROWS.inc(len(changes['new']), result='new')
+            SYNC_ROWS.inc(len(changes['changed']), result='changed')
+            SYNC_ROWS.inc(changes['unchanged'], result='unchanged')
+            SYNC_ROWS.inc(len(changes['missing']), result='missing')
         return jsonify({
             'success': True,
-            'new_records': new_records,
-            'updated_records': updated_records
+            'dry_run': dry_run,
+            'new_records': len(changes['new']),
+            'updated_records': len(changes['changed']),
+            'unchanged_records': changes['unchanged'],
+            'missing_records': len(changes['missing'])
         })
         
     except Exception as e:
+        SYNC_RUNS.inc(outcome='error')
         conn.rollback()
-        return jsonify({'error': str(e)}), 500
+        if changes is None:
+            return jsonify({'error': str(e)}), 500
+        # Les lots précédents restent écrits : les nouvelles lignes sont envoyées en premier
+        new_committed = min(committed, len(changes['new']))
+        SYNC_ROWS.inc(new_committed, result='new')
+        SYNC_ROWS.inc(committed - new_committed, result='changed')
+        return jsonify({
+            'error': str(e),
+            'new_records_committed': new_committed,
+            'updated_records_committed': committed - new_committed,
+            'records_not_written': len(changes['new']) + len(changes['changed']) - committed
+        }), 500
     finally:
         cursor.close()
         conn.close()
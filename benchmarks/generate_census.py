@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from normalization import UNIVERSITY_ABBREVIATIONS
+
+# Générateur de lignes `etudiants` synthétiques, avec les variantes
+# d'orthographe que la normalisation doit absorber (genre, ville,
+# université, faculté, niveau d'étude).
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+
+PRENOMS = ['Kouadio', 'Aya', 'Koffi', 'Adjoua', 'Yao', 'Amenan', 'Konan', 'Affoué', 'Kouassi', 'Akissi',
+           'Serge', 'Marie-Laure', 'Jean-Baptiste', 'Désiré', 'Ange', 'Christelle', 'Hervé', 'Aïcha',
+           'Moussa', 'Fatoumata', 'Éric', 'Noël', 'Брис', 'Куаме']
+NOMS = ['KOUAME', 'KOUASSI', 'KONAN', "N'GUESSAN", 'TRAORÉ', 'KONÉ', 'OUATTARA', 'BAMBA', 'YAO',
+        'DIABATÉ', 'GBAGBO', 'ASSI', 'ZADI', 'GNAHORÉ', 'KOUAKOU', 'Куасси', 'Диабате']
+
+# Variantes d'orthographe et leur fréquence relative
+GENRES = {'M': 30, 'F': 25, 'Homme': 10, 'Femme': 10, 'homme ': 3, 'femme.': 3, 'Male': 3,
+          'Female': 3, 'masculin': 2, 'Féminin': 2, 'H': 2, 'm': 2, 'Autre': 1, '': 2, None: 2}
+VILLES = {'Tomsk': 40, 'Tomsk ': 5, 'tomsk': 5, 'Tomks': 3, 'Tomsk City': 3, 'Tomskaya Oblast': 2,
+          'Томск': 4, 'Kemerovo': 10, 'Kemerovo ': 2, 'Kemerovo City': 2, 'Kemerovskaya Oblast': 1,
+          'Novosibirsk': 8, 'Novossibirsk': 4, '': 2, None: 2}
+UNIVERSITES = {**{name: 4 for name in UNIVERSITY_ABBREVIATIONS},
+               "Université d'Etat de Tomsk ": 6, "université polytechnique de tomsk": 5,
+               "Université d'Etat de Novossibirsk d'Economie": 2, "Tomsk Polytechnic University": 3,
+               'Université Inconnue de Barnaoul': 1, '': 3, None: 2}
+FACULTES = {"Faculté d'économie": 10, 'Faculty of Economics': 5, 'economie': 4, 'Médecine générale': 10,
+            'medecine': 4, 'Faculty of Medicine': 4, 'médical': 2, 'Informatique': 8, 'IT': 4,
+            'Computer Science': 4, 'Ingénierie pétrolière': 6, 'Engineering': 4, 'ingenierie': 2,
+            'Droit': 4, 'Law': 2, 'Philologie russe': 3, 'Chimie': 3, '': 4, None: 3}
+NIVEAUX = {'Master': 20, 'Master ': 3, 'Masters': 3, 'M1': 5, 'M2': 5, 'Bachelor': 20, 'Licence': 8,
+           'Doctorat': 8, 'PhD': 4, 'Spécialiste': 6, 'Année de langue': 8, '': 2}
+STATUTS = {'Étudiant actuel': 85, 'Ancien étudiant': 15}
+
+def _choice(rng, weights, size):
+    values = list(weights)
+    probabilities = np.array(list(weights.values()), dtype=float)
+    codes = rng.choice(len(values), size=size, p=probabilities / probabilities.sum())
+    return pd.Series(np.array(values, dtype=object)[codes])
+
+def generate_etudiants(rows, seed=0):
+    """Renvoie `rows` lignes brutes de la table etudiants, telles que renvoyées par la base"""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, rows + 1)
+    prenoms = np.array(PRENOMS, dtype=object)[rng.integers(len(PRENOMS), size=rows)]
+    noms = np.array(NOMS, dtype=object)[rng.integers(len(NOMS), size=rows)]
+    nom_complet = pd.Series(noms) + ' ' + pd.Series(prenoms)
+    # Espaces superflus, comme dans les réponses au formulaire
+    nom_complet = nom_complet.where(rng.random(rows) > 0.1, nom_complet + '  ')
+
+    inscription = (np.datetime64('2019-09-01') + rng.integers(0, 6 * 365, size=rows).astype('timedelta64[D]')).astype(str)
+    modification = pd.Series(
+        (np.datetime64('2025-01-01T00:00:00') + rng.integers(0, 3600 * 24 * 300, size=rows).astype('timedelta64[s]')).astype(str)
+    ) + '+00:00'
+    numbers = pd.Series(rng.integers(0, 10**9, size=rows)).astype(str).str.zfill(9)
+    streets = pd.Series(rng.integers(1, 300, size=rows))
+    return pd.DataFrame({
+        'id': ids,
+        'date_inscription': inscription,
+        'email': 'etudiant' + pd.Series(ids).astype(str) + '@exemple.ci',
+        'nom_complet': nom_complet,
+        'genre': _choice(rng, GENRES, rows),
+        'universite': _choice(rng, UNIVERSITES, rows),
+        'faculte': _choice(rng, FACULTES, rows),
+        'niveau_etude': _choice(rng, NIVEAUX, rows),
+        'telephone': '+7 9' + numbers,
+        'adresse': 'ул. Ленина ' + streets.astype(str) + ', кв. ' + (streets % 97).astype(str),
+        'ville': _choice(rng, VILLES, rows),
+        'statut': _choice(rng, STATUTS, rows),
+        'date_creation': modification,
+        'date_modification': modification
+    })
+
+def parse_size(value):
+    return SIZES[value] if value in SIZES else int(value)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère des lignes etudiants synthétiques")
+    parser.add_argument("--rows", type=parse_size, default=1_000, help="Nombre de lignes (ou 1k, 10k, 100k, 1M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="Fichier de sortie (.csv ou .parquet)")
+    args = parser.parse_args()
+
+    df = generate_etudiants(args.rows, args.seed)
+    if args.output.endswith('.parquet'):
+        df.to_parquet(args.output, index=False)
+    else:
+        df.to_csv(args.output, index=False)
+    print(f"{len(df)} lignes écrites dans {args.output}")
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Mesure le temps d'import des points d'entrée avec `python -X importtime`,
+# dans des processus neufs, et le compare au budget de import_budget.json.
+# Code de sortie 1 si un module dépasse son budget.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+# Marge appliquée aux mesures par --write-budget
+BUDGET_MARGIN = 1.25
+
+def parse_importtime(stderr):
+    """Renvoie [(niveau, module, self_us, cumulé_us)] à partir de la sortie de -X importtime"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        level = (len(name) - len(name.lstrip())) // 2
+        entries.append((level, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+def measure(module):
+    """Import de `module` dans un processus neuf : (temps cumulé en µs, imports directs)"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible:\n{result.stderr[-2000:]}")
+    entries = parse_importtime(result.stderr)
+    # Le module mesuré est la dernière entrée de niveau 0 ; ses imports directs
+    # (niveau 1) le précèdent immédiatement
+    position = max(i for i, entry in enumerate(entries) if entry[0] == 0 and entry[1] == module)
+    children = []
+    for level, name, _, cumulative_us in reversed(entries[:position]):
+        if level == 0:
+            break
+        if level == 1:
+            children.append((name, cumulative_us))
+    return entries[position][3], children
+
+def run(modules, repeat):
+    results = {}
+    for module in modules:
+        timings = []
+        children = []
+        for _ in range(repeat):
+            cumulative_us, children = measure(module)
+            timings.append(cumulative_us / 1000)
+        results[module] = {
+            'median_ms': round(statistics.median(timings), 1),
+            'min_ms': round(min(timings), 1),
+            'runs_ms': [round(t, 1) for t in timings],
+            'heaviest_imports': sorted(
+                ({'module': name, 'ms': round(us / 1000, 1)} for name, us in children),
+                key=lambda child: -child['ms']
+            )[:10]
+        }
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import de app.py et app_flask.py comparé au budget")
+    parser.add_argument("modules", nargs="*", help="Modules à mesurer (par défaut ceux du budget)")
+    parser.add_argument("--repeat", type=int, default=5, help="Nombre de processus par module (médiane)")
+    parser.add_argument("--json", help="Fichier où écrire les résultats")
+    parser.add_argument("--write-budget", action="store_true", help="Remplacer le budget par les mesures (+25 %%)")
+    args = parser.parse_args()
+
+    with open(BUDGET_FILE, 'r') as f:
+        budget = json.load(f)
+    results = run(args.modules or list(budget), args.repeat)
+
+    over_budget = []
+    for module, result in results.items():
+        limit = budget.get(module)
+        status = "" if limit is None else f" (budget {limit} ms)"
+        if limit is not None and result['median_ms'] > limit:
+            over_budget.append(module)
+            status += " DÉPASSÉ"
+        print(f"{module}: {result['median_ms']} ms{status}")
+        for child in result['heaviest_imports'][:5]:
+            print(f"    {child['module']}: {child['ms']} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'budget': budget, 'results': results}, f, indent=2)
+    if args.write_budget:
+        budget.update({module: round(result['median_ms'] * BUDGET_MARGIN) for module, result in results.items()})
+        with open(BUDGET_FILE, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+    sys.exit(1 if over_budget and not args.write_budget else 0)
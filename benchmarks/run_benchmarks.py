@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_census import SIZES, generate_etudiants, parse_size
+import aggregates
+from data_cache import CATEGORY_COLUMNS, DatasetCache, RecordIndex, compact_frame
+from filter_index import FilterIndex
+from normalization import abbreviate_universities, clean_data, normalize_facultes, normalize_genres
+from search_index import SearchIndex
+
+# Mesures des chemins critiques sur des données synthétiques. Les résultats
+# (secondes, meilleur de `repeat` essais) sont écrits en JSON dans
+# benchmarks/results/ pour comparer les exécutions entre elles (--compare).
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SIZES = ['1k', '10k', '100k']
+
+def best_of(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def load_frame(raw):
+    """Même préparation que DatasetCache après un chargement complet"""
+    df = clean_data(raw.copy())
+    df['genre'] = normalize_genres(df['genre'])
+    return compact_frame(df)
+
+def filters_for(df):
+    # Sélection typique de la barre latérale : quelques valeurs par colonne
+    return {
+        'genre': ['Homme', 'Femme'],
+        'universite': df['universite'].value_counts().index[:5].tolist(),
+        'niveau_etude': ['Master', 'Bachelor'],
+        'ville': ['Tomsk'],
+        'statut': ['Étudiant actuel']
+    }
+
+def filter_with_isin(df, filters):
+    # Ancienne application des filtres : une copie par filtre, sur des colonnes object
+    for column, values in filters.items():
+        df = df[df[column].isin(values)]
+    return df
+
+def bench_frame(raw, repeat):
+    """Normalisation, agrégats, filtres, recherche et tri"""
+    results = {}
+    results['chargement (clean_data + compaction)'] = best_of(lambda: load_frame(raw), repeat)
+    results['normalize_genres'] = best_of(lambda: normalize_genres(raw['genre']), repeat)
+    results['abbreviate_universities'] = best_of(lambda: abbreviate_universities(raw['universite']), repeat)
+    results['normalize_facultes'] = best_of(lambda: normalize_facultes(raw['faculte']), repeat)
+
+    df = load_frame(raw)
+    filters = filters_for(df)
+    results['cube (construction)'] = best_of(lambda: aggregates.build_cube(df), repeat)
+    cube = aggregates.build_cube(df)
+    results['statistiques (depuis le cube)'] = best_of(lambda: (
+        aggregates.niveau_counts(aggregates.slice_cube(cube, filters)),
+        aggregates.university_counts(aggregates.slice_cube(cube, filters)),
+        aggregates.faculty_stats(aggregates.slice_cube(cube, filters))
+    ), repeat)
+
+    # Référence : le jeu de données tel qu'il était avant la compaction en catégories
+    df_object = df.astype({column: object for column in CATEGORY_COLUMNS if column in df.columns})
+    results['filtres (isin successifs, colonnes object)'] = best_of(lambda: filter_with_isin(df_object, filters), repeat)
+    results['filtres (index, construction)'] = best_of(lambda: FilterIndex(df), repeat)
+    index = FilterIndex(df)
+    results['filtres (bitmaps)'] = best_of(lambda: df.iloc[index.select(filters)], repeat)
+
+    results['recherche (str.contains)'] = best_of(
+        lambda: df[df['nom_complet'].str.contains('kouame', case=False, na=False)], repeat
+    )
+    results['recherche (index, construction)'] = best_of(lambda: SearchIndex(df, include_email=True), repeat)
+    search_index = SearchIndex(df, include_email=True)
+    results['recherche (index)'] = best_of(lambda: df.iloc[search_index.search('kouame')], repeat)
+
+    results['tri (nom_complet)'] = best_of(lambda: df.sort_values('nom_complet'), repeat)
+    results['tri (universite)'] = best_of(lambda: df.sort_values('universite', ascending=False), repeat)
+    results['modification (patch + structures dérivées)'] = bench_patch(df, repeat)
+    return results
+
+def bench_patch(df, repeat):
+    """Modification d'une fiche dans le cache, structures dérivées de app.py comprises"""
+    cache = DatasetCache(lambda: df)
+    structures = {
+        'search_index': (lambda data: SearchIndex(data, include_email=True), SearchIndex.patched),
+        'filter_index': (FilterIndex, FilterIndex.patched),
+        'cube': (aggregates.build_cube, aggregates.patch_cube),
+        'record_index': (RecordIndex, RecordIndex.patched)
+    }
+
+    def use_structures():
+        cache.get()
+        for name, (builder, update) in structures.items():
+            cache.derived(name, builder, update=update)
+
+    use_structures()
+    # Ligne telle que renvoyée par Supabase : valeurs JSON
+    row = df.iloc[[len(df) // 2]].astype(object)
+    row = row.where(row.notna(), None).to_dict('records')[0]
+    row = {column: value.isoformat() if hasattr(value, 'isoformat') else value for column, value in row.items()}
+
+    def edit():
+        row['telephone'] = f"+7 {time.perf_counter_ns()}"
+        cache.patch([row])
+        use_structures()
+    return best_of(edit, repeat)
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.columns = None
+        self.bounds = None
+        self.payload = None
+
+    def select(self, columns="*"):
+        self.columns = columns.split(',')
+        return self
+
+    def order(self, column):
+        # Les lignes du faux client sont déjà dans l'ordre des id
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.payload = payload
+        return self
+
+    def execute(self):
+        # Latence d'un aller-retour HTTP
+        time.sleep(self.client.latency)
+        if self.payload is not None:
+            return type('Response', (), {'data': self.payload})
+        start, end = self.bounds
+        rows = self.client.rows[start:end + 1]
+        return type('Response', (), {'data': [{column: row.get(column) for column in self.columns} for row in rows]})
+
+class FakeSupabase:
+    """Client Supabase minimal : lecture paginée et upsert, avec une latence fixe"""
+
+    def __init__(self, rows, latency):
+        self.rows = rows
+        self.latency = latency
+
+    def table(self, name):
+        return FakeQuery(self)
+
+def bench_update_database(raw, latency, concurrencies):
+    """update_database : moitié des lignes déjà en base, dont une sur cinq modifiée"""
+    import app
+
+    df = load_frame(raw)
+    existing = df.iloc[:len(df) // 2].astype(object).where(df.iloc[:len(df) // 2].notna(), None)
+    existing = existing.to_dict('records')
+    for row in existing[::5]:
+        row['telephone'] = '+7 0000000000'
+    sheet = df.drop(columns=['id', 'statut', 'date_creation', 'date_modification'])
+
+    results = {}
+    for concurrency in concurrencies:
+        client = FakeSupabase(existing, latency)
+        start = time.perf_counter()
+        rapport = app.update_database(sheet, client, concurrency=concurrency)
+        results[f"update_database (concurrence {concurrency})"] = time.perf_counter() - start
+        results['lignes écrites'] = rapport['inserted'] + rapport['updated']
+    return results
+
+def bench_sync(raw):
+    """/api/sync sur une base MySQL locale dédiée (BENCH_MYSQL_DATABASE), vidée au préalable"""
+    os.environ['MYSQL_DATABASE'] = os.environ['BENCH_MYSQL_DATABASE']
+    import app_flask
+
+    sheet = raw.rename(columns={'nom_complet': 'nom', 'email': 'adresse_e_mail'})
+    sheet['genre'] = normalize_genres(sheet['genre'])
+    # schema.sql déclare ces colonnes NOT NULL : chaînes vides plutôt que None
+    text_columns = ['universite', 'faculte', 'niveau_etude', 'telephone', 'adresse', 'ville']
+    sheet[text_columns] = sheet[text_columns].fillna('')
+    app_flask.load_from_google_sheets = lambda sheet_id: sheet.copy()
+
+    conn = app_flask.get_db_connection()
+    if conn is None:
+        raise RuntimeError("Base MySQL de test injoignable")
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM etudiants")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    client = app_flask.app.test_client()
+    results = {}
+    for label, url in (("/api/sync (table vide)", '/api/sync'),
+                       ("/api/sync (sans changement)", '/api/sync'),
+                       ("/api/sync (simulation)", '/api/sync?dry_run=1')):
+        start = time.perf_counter()
+        response = client.post(url)
+        results[label] = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: {response.get_json()}")
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(previous_path, results):
+    with open(previous_path, 'r') as f:
+        previous = json.load(f)['results']
+    print(f"\nComparaison avec {previous_path} (rapport actuel / précédent) :")
+    for size, measures in results.items():
+        for name, value in measures.items():
+            before = previous.get(size, {}).get(name)
+            if isinstance(before, (int, float)) and before > 0 and isinstance(value, float):
+                print(f"  {size:>5} {name}: {value / before:.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mesures de performance sur des données synthétiques")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help=f"Tailles ({', '.join(SIZES)} ou un nombre)")
+    parser.add_argument("--repeat", type=int, default=3, help="Essais par mesure (le meilleur est gardé)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latence simulée d'une requête Supabase (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Concurrences testées pour update_database")
+    parser.add_argument("--skip-update", action="store_true", help="Ne pas mesurer update_database")
+    parser.add_argument("--output", help="Fichier JSON de résultats (par défaut benchmarks/results/<date>.json)")
+    parser.add_argument("--compare", help="Fichier JSON d'une exécution précédente")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        rows = parse_size(size)
+        print(f"== {size} ({rows} lignes)")
+        raw = generate_etudiants(rows)
+        measures = bench_frame(raw, args.repeat)
+        if not args.skip_update:
+            measures.update(bench_update_database(raw, args.latency, args.concurrency))
+        if os.getenv('BENCH_MYSQL_DATABASE'):
+            try:
+                measures.update(bench_sync(raw))
+            except Exception as e:
+                measures['/api/sync'] = f"non mesuré: {e}"
+        else:
+            measures['/api/sync'] = "non mesuré: BENCH_MYSQL_DATABASE non défini"
+        for name, value in measures.items():
+            print(f"  {name}: {value * 1000:.1f} ms" if isinstance(value, float) else f"  {name}: {value}")
+        results[size] = measures
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'machine': platform.platform(),
+                'repeat': args.repeat,
+                'latency': args.latency
+            },
+            'results': results
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats écrits dans {output}")
+    if args.compare:
+        compare(args.compare, results)
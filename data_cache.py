@@ -0,0 +1,465 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from snapshot import load_snapshot, save_snapshot
+
+# Fuseau horaire de Tomsk (UTC+7)
+TOMSK_TZ = timezone(timedelta(hours=7))
+
+# Colonnes à faible cardinalité stockées en catégories (codes entiers)
+CATEGORY_COLUMNS = ['genre', 'ville', 'universite', 'faculte', 'niveau_etude', 'statut']
+DATE_COLUMNS = ['date_inscription']
+TIMESTAMP_COLUMNS = ['date_creation', 'date_modification']
+
+class DatasetCache:
+    """Cache du jeu de données partagé par toutes les sessions du processus.
+
+    Le chargement est fait par `loader`, une fonction sans argument qui renvoie
+    le DataFrame nettoyé (ou None en cas d'échec). Quand plusieurs sessions
+    trouvent le cache expiré en même temps, une seule exécute le chargement :
+    les autres attendent son résultat.
+
+    Si `delta_loader` est fourni, les rafraîchissements ne téléchargent que
+    les lignes modifiées depuis le dernier `date_modification` connu, puis
+    les fusionnent par `id` (ou `email`) dans le DataFrame en cache. Un
+    rechargement complet est tout de même fait toutes les
+    `full_reload_interval` secondes, notamment pour voir les suppressions.
+
+    Avec `start_refresher`, un thread recharge les données à intervalle fixe :
+    un cache simplement expiré continue d'être servi pendant le rechargement
+    (stale-while-revalidate). Seuls le premier chargement et une invalidation
+    explicite (après une écriture) font attendre la session.
+
+    Avec `snapshot_path`, chaque nouvelle version est enregistrée dans un
+    instantané Parquet local ; au démarrage, il est servi tel quel puis
+    revalidé auprès de la base comme un cache de son âge.
+    """
+
+    def __init__(self, loader, ttl=300, delta_loader=None, full_reload_interval=3600, snapshot_path=None):
+        self._loader = loader
+        self.snapshot_path = snapshot_path
+        self._delta_loader = delta_loader
+        self.ttl = ttl
+        self.full_reload_interval = full_reload_interval
+        # (données, version), remplacés d'un seul bloc : une version lue avec
+        # les données est toujours celle de ces données
+        self._state = (None, 0)
+        self._loaded_at = None
+        self._full_loaded_at = None
+        self._full_requested = False
+        self._generation = 0
+        # Nombre d'appels à invalidate(), et sa valeur au début du dernier chargement
+        # terminé : un chargement commencé avant une invalidation ne la satisfait pas
+        self._invalidations = 0
+        self._loaded_invalidations = 0
+        # Verrou "single-flight" : un seul chargement à la fois
+        self._refresh_lock = threading.Lock()
+        self.last_update = None
+        # Empreinte mémoire (octets) du DataFrame avant et après compaction, au dernier chargement
+        self.memory_usage = {}
+        # Structures dérivées (agrégats, index...) : nom -> (version, valeur, mise à jour)
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+        # Rafraîchissement en arrière-plan
+        self._refresher = None
+        self._wake = threading.Event()
+        self.last_error = None
+        # Écriture de l'instantané en arrière-plan, hors du chemin des requêtes
+        self._snapshot_writer = None
+        self._snapshot_pending = False
+        self._snapshot_lock = threading.Lock()
+
+    @property
+    def _data(self):
+        return self._state[0]
+
+    @property
+    def version(self):
+        return self._state[1]
+
+    def _publish(self, df, changed=True):
+        self._state = (df, self.version + 1 if changed else self.version)
+
+    def is_stale(self):
+        if self._data is None or self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self, full=False):
+        """Marque le cache comme expiré pour toutes les sessions."""
+        if full:
+            self._full_requested = True
+        self._invalidations += 1
+        self._loaded_at = None
+
+    def age(self):
+        """Secondes écoulées depuis le dernier chargement réussi (None si jamais chargé)"""
+        loaded_at = self._loaded_at
+        return None if loaded_at is None else time.monotonic() - loaded_at
+
+    def get(self):
+        """Renvoie le jeu de données, en le rechargeant s'il a expiré."""
+        if not self.is_stale():
+            return self._data
+        if self._refresher is not None and self._data is not None and self._loaded_at is not None:
+            # Expiré mais valide : on sert l'instantané et on réveille le thread
+            self._wake.set()
+            return self._data
+
+        generation = self._generation
+        invalidations = self._invalidations
+        with self._refresh_lock:
+            # Une autre session a déjà rechargé les données pendant l'attente,
+            # avec un chargement commencé après la dernière invalidation vue
+            if (self._generation != generation and self._loaded_invalidations >= invalidations
+                    and self._data is not None):
+                return self._data
+            if self._data is None and self._load_snapshot():
+                if not self.is_stale():
+                    return self._data
+                if self._refresher is not None:
+                    # Instantané expiré : servi tout de même, revalidé en arrière-plan
+                    self._wake.set()
+                    return self._data
+            self._load()
+        return self._data
+
+    def get_versioned(self):
+        """Comme get(), mais renvoie (données, version) lus ensemble"""
+        self.get()
+        return self._state
+
+    def start_refresher(self, interval):
+        """Démarre (une seule fois) le thread qui recharge les données toutes les `interval` secondes"""
+        with self._derived_lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, args=(interval,), name="dataset-refresher", daemon=True
+            )
+        self._refresher.start()
+
+    def _refresh_loop(self, interval):
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.refresh()
+
+    def refresh(self):
+        """Recharge les données ; en cas d'erreur, le dernier jeu valide reste servi"""
+        with self._refresh_lock:
+            try:
+                self._load()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Erreur lors du rafraîchissement des données: {e}")
+
+    def patch(self, upserted=None, deleted=None):
+        """Applique au cache les lignes renvoyées par une écriture, sans tout recharger.
+
+        `upserted` : lignes ajoutées ou modifiées, `deleted` : lignes supprimées.
+        Seules ces lignes sont converties ; les lignes modifiées gardent leur
+        position. Les structures dérivées qui ont une fonction de mise à jour
+        (voir derived) sont mises à jour à partir des lignes touchées, les
+        autres recalculées à leur prochaine utilisation. Renvoie False si rien
+        n'a pu être appliqué (cache vide, réponse vide) : l'appelant doit alors
+        recharger la table.
+        """
+        if not upserted and not deleted:
+            return False
+        with self._refresh_lock:
+            if self._data is None:
+                return False
+            df = self._data
+            changes = []
+            if upserted:
+                df, change = upsert_rows(df, compact_frame(pd.DataFrame(upserted)))
+                changes.append(change)
+            if deleted:
+                deleted = pd.DataFrame(deleted)
+                key = 'id' if 'id' in df.columns and 'id' in deleted.columns else 'email'
+                if key not in deleted.columns:
+                    return False
+                df, change = remove_rows(df, key, deleted[key])
+                changes.append(change)
+            with self._derived_lock:
+                # Structures de la version courante mises à jour, puis publiées avec les
+                # données : une session ne voit jamais une version sans ses structures
+                version = self.version
+                updated = {}
+                for name, (entry_version, value, update) in self._derived.items():
+                    if entry_version != version or update is None or None in changes:
+                        continue
+                    for change in changes:
+                        value = update(value, change)
+                    updated[name] = (version + 1, value, update)
+                # memory_usage reste celle du dernier chargement : la mesurer coûte plus que la modification
+                self._publish(df)
+                self._derived.update(updated)
+        self._save_snapshot()
+        return True
+
+    def derived(self, name, builder, data=None, update=None):
+        """Renvoie builder(données), calculé une seule fois par version du jeu de données.
+
+        Si `data` est un instantané qui n'est plus le jeu courant, la valeur est
+        calculée sur cet instantané sans être mise en cache. `update(valeur,
+        modification)` renvoie la valeur pour les données modifiées par patch
+        (voir FrameChange) sans tout recalculer.
+        """
+        current, version = self._state
+        if data is not None and data is not current:
+            return builder(data)
+        data = current
+        entry = self._derived.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._derived_lock:
+            entry = self._derived.get(name)
+            if entry is None or entry[0] != version:
+                entry = (version, builder(data), update)
+                self._derived[name] = entry
+        return entry[1]
+
+    def _needs_full_reload(self):
+        if self._delta_loader is None or self._data is None or self._full_requested:
+            return True
+        if 'date_modification' not in self._data.columns:
+            return True
+        return time.monotonic() - self._full_loaded_at > self.full_reload_interval
+
+    def _load(self):
+        invalidations = self._invalidations
+        if self._needs_full_reload():
+            df = self._loader()
+            if df is None:
+                return
+            self._full_loaded_at = time.monotonic()
+            if self._invalidations == invalidations:
+                self._full_requested = False
+            changed = True
+        else:
+            changes = self._delta_loader(watermark(self._data))
+            if changes is None:
+                return
+            # La requête (>= watermark) renvoie toujours au moins la dernière ligne connue
+            changes = drop_known_rows(self._data, changes)
+            changed = not changes.empty
+            df = merge_rows(self._data, changes) if changed else self._data
+        if changed:
+            before = frame_memory(df)
+            df = compact_frame(df)
+            self.memory_usage = {'before': before, 'after': frame_memory(df)}
+        self._publish(df, changed)
+        if self._invalidations == invalidations:
+            self._loaded_at = time.monotonic()
+        # Sinon le cache reste expiré : ces données peuvent précéder l'écriture qui l'a invalidé
+        self._loaded_invalidations = invalidations
+        self._generation += 1
+        if changed:
+            self._save_snapshot()
+        self.last_update = datetime.now(TOMSK_TZ)
+
+    def _load_snapshot(self):
+        """Publie l'instantané local s'il existe ; il est considéré chargé à sa date d'écriture"""
+        if not self.snapshot_path:
+            return False
+        df, info = load_snapshot(self.snapshot_path)
+        if df is None:
+            return False
+        saved_at = info.get('saved_at', 0)
+        loaded_at = time.monotonic() - max(0.0, time.time() - saved_at)
+        # DataFrame tout juste lu : converti sur place, sans seconde copie
+        self._publish(compact_frame(df, copy=False))
+        self._loaded_at = loaded_at
+        self._full_loaded_at = loaded_at
+        self._loaded_invalidations = self._invalidations
+        self._generation += 1
+        self.last_update = datetime.fromtimestamp(saved_at, TOMSK_TZ)
+        return True
+
+    def _save_snapshot(self):
+        """Demande l'écriture de l'instantané ; un thread écrit la dernière version publiée"""
+        if not self.snapshot_path:
+            return
+        with self._snapshot_lock:
+            self._snapshot_pending = True
+            if self._snapshot_writer is not None:
+                return
+            self._snapshot_writer = threading.Thread(
+                target=self._snapshot_loop, name="dataset-snapshot", daemon=True
+            )
+        self._snapshot_writer.start()
+
+    def _snapshot_loop(self):
+        # Les demandes arrivées pendant une écriture sont regroupées en une seule
+        while True:
+            with self._snapshot_lock:
+                if not self._snapshot_pending:
+                    self._snapshot_writer = None
+                    return
+                self._snapshot_pending = False
+            try:
+                data, version = self._state
+                save_snapshot(data, self.snapshot_path, version)
+            except Exception as e:
+                # L'instantané n'est qu'une accélération : l'échec n'empêche pas de servir les données
+                print(f"Erreur lors de l'écriture de l'instantané: {e}")
+
+class FrameChange:
+    """Modification du jeu de données par DatasetCache.patch, pour mettre à jour
+    les structures dérivées à partir des seules lignes touchées.
+
+    Une modification écrit des lignes ou en supprime, pas les deux :
+    `updated` sont les positions des lignes remplacées sur place (les mêmes
+    dans `before` et `after`), `added` celles des lignes ajoutées à la fin de
+    `after`, `removed` les positions dans `before` des lignes supprimées.
+    """
+
+    def __init__(self, before, after, updated=(), added=(), removed=()):
+        self.before = before
+        self.after = after
+        self.updated = np.asarray(updated, dtype=np.int64)
+        self.added = np.asarray(added, dtype=np.int64)
+        self.removed = np.asarray(removed, dtype=np.int64)
+
+    @property
+    def written(self):
+        """Positions dans `after` des lignes modifiées ou ajoutées"""
+        return np.concatenate([self.updated, self.added])
+
+    def new_positions(self):
+        """Position dans `after` de chaque ligne de `before` (-1 si supprimée)"""
+        kept = np.ones(len(self.before), dtype=bool)
+        kept[self.removed] = False
+        positions = np.cumsum(kept) - 1
+        positions[~kept] = -1
+        return positions
+
+class RecordIndex:
+    """Position de chaque ligne du jeu de données par `id` et par `email`"""
+
+    def __init__(self, df):
+        positions = range(len(df))
+        self._by_id = dict(zip(df['id'], positions)) if 'id' in df.columns else {}
+        self._by_email = dict(zip(df['email'], positions)) if 'email' in df.columns else {}
+
+    def patched(self, change):
+        """Index du jeu de données modifié (voir FrameChange)"""
+        if len(change.removed):
+            # Toutes les lignes suivantes changent de position : index reconstruit
+            return RecordIndex(change.after)
+        index = RecordIndex.__new__(RecordIndex)
+        index._by_id = dict(self._by_id)
+        index._by_email = dict(self._by_email)
+        written = change.written
+        for column, positions in (('id', index._by_id), ('email', index._by_email)):
+            if column not in change.after.columns:
+                continue
+            # Une ligne modifiée a pu changer d'email
+            for value in change.before[column].iloc[change.updated]:
+                positions.pop(value, None)
+            positions.update(zip(change.after[column].iloc[written], written.tolist()))
+        return index
+
+    def by_id(self, student_id):
+        return self._by_id.get(student_id)
+
+    def by_email(self, email):
+        return self._by_email.get(email)
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
+
+def compact_frame(df, copy=True):
+    """Convertit les colonnes répétitives en catégories et les dates en datetime.
+
+    copy=False modifie `df` lui-même (DataFrame qui n'est partagé avec personne).
+    """
+    if copy:
+        df = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    for column in DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors='coerce', format='ISO8601')
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], utc=True, errors='coerce', format='ISO8601')
+    return df
+
+def watermark(df):
+    """Renvoie le plus grand `date_modification` du DataFrame (format ISO)."""
+    dates = pd.to_datetime(df['date_modification'], utc=True, errors='coerce', format='ISO8601')
+    latest = dates.max()
+    if pd.isna(latest):
+        return '1970-01-01T00:00:00+00:00'
+    return latest.isoformat()
+
+def drop_known_rows(df, changes):
+    """Retire de `changes` les lignes déjà en cache à l'identique (même clé, même `date_modification`)"""
+    if changes.empty or 'date_modification' not in changes.columns or 'date_modification' not in df.columns:
+        return changes
+    key = 'id' if 'id' in df.columns and 'id' in changes.columns else 'email'
+    known = pd.MultiIndex.from_arrays([
+        df[key], pd.to_datetime(df['date_modification'], utc=True, errors='coerce', format='ISO8601')
+    ])
+    fetched = pd.MultiIndex.from_arrays([
+        changes[key], pd.to_datetime(changes['date_modification'], utc=True, errors='coerce', format='ISO8601')
+    ])
+    return changes[~fetched.isin(known)]
+
+def upsert_rows(df, rows):
+    """Comme merge_rows, pour des lignes déjà compactées : les lignes connues sont
+    remplacées à leur position, les autres ajoutées, sans reconvertir `df`.
+
+    Renvoie (DataFrame, FrameChange) ; la modification est None si les lignes
+    ont changé de position (clé en double dans `df`).
+    """
+    key = 'id' if 'id' in df.columns and 'id' in rows.columns else 'email'
+    rows = rows.drop_duplicates(subset=key, keep='last').reset_index(drop=True)
+    if not df[key].is_unique:
+        return compact_frame(merge_rows(df, rows)), None
+    before = df
+    df = df.copy()
+    # Catégories communes, triées comme après compact_frame : l'ordre des
+    # catégories est celui du tri ("Trier par" ville, université...)
+    for column in CATEGORY_COLUMNS:
+        if column in rows.columns and column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = df[column].cat.categories
+            if len(rows[column].cat.categories.difference(categories)):
+                categories = categories.union(rows[column].cat.categories)
+                df[column] = df[column].cat.set_categories(categories)
+            rows[column] = rows[column].cat.set_categories(categories)
+    positions = pd.Index(df[key]).get_indexer(rows[key])
+    known = positions >= 0
+    if known.any():
+        for column in rows.columns.intersection(df.columns):
+            df.iloc[positions[known], df.columns.get_loc(column)] = rows.loc[known, column].array
+    if known.all():
+        return df, FrameChange(before, df, updated=positions[known])
+    added = np.arange(len(df), len(df) + int((~known).sum()))
+    df = pd.concat([df, rows[~known]], ignore_index=True)
+    # Colonnes absentes des nouvelles lignes : le type catégoriel a pu être perdu
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df, FrameChange(before, df, updated=positions[known], added=added)
+
+def remove_rows(df, key, values):
+    """Retire de `df` les lignes dont `key` est dans `values` ; renvoie (DataFrame, FrameChange)"""
+    removed = df[key].isin(values).to_numpy()
+    after = df[~removed].reset_index(drop=True)
+    return after, FrameChange(df, after, removed=np.flatnonzero(removed))
+
+def merge_rows(df, changes):
+    """Remplace ou ajoute les lignes de `changes` dans `df`, par `id` ou par `email`."""
+    key = 'id' if 'id' in df.columns and 'id' in changes.columns else 'email'
+    unchanged = df[~df[key].isin(changes[key])]
+    return pd.concat([unchanged, changes], ignore_index=True)
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+class FigureCache:
+    """Cache LRU borné des figures plotly, partagé par toutes les sessions.
+
+    Les clés sont de la forme (version du jeu de données, signature des filtres,
+    nom du graphique) : une figure n'est reconstruite que si les données ou les
+    filtres qui la concernent ont changé.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Dernière durée de construction (secondes) par nom de graphique
+        self.build_times = {}
+
+    def get(self, key, builder):
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+
+        start = time.perf_counter()
+        figure = builder()
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.build_times[key[-1]] = elapsed
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_size:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._figures),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'build_times': dict(self.build_times)
+            }
+
+def filter_signature(filters, search=""):
+    """Représentation stable (hachable) des filtres actifs"""
+    return (
+        tuple(sorted((column, tuple(sorted(map(str, values)))) for column, values in filters.items())),
+        search
+    )
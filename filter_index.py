@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# Colonnes proposées dans les filtres de la barre latérale
+FILTER_COLUMNS = ['genre', 'universite', 'niveau_etude', 'ville', 'statut']
+
+def _bitmaps(codes, count):
+    # Un bitmap compacté par code, une ligne par valeur
+    return np.array(
+        [np.packbits(codes == code) for code in range(count)],
+        dtype=np.uint8
+    ).reshape(count, -1)
+
+def _set_bits(bitmaps, codes, positions, value):
+    # Met à 1 (ou à 0) le bit de chaque position dans le bitmap de son code
+    columns = positions // 8
+    bits = (0x80 >> (positions % 8)).astype(np.uint8)
+    if value:
+        np.bitwise_or.at(bitmaps, (codes, columns), bits)
+    else:
+        np.bitwise_and.at(bitmaps, (codes, columns), ~bits)
+
+class FilterIndex:
+    """Bitmaps par valeur des colonnes filtrables, calculés une fois par version.
+
+    Chaque valeur distincte d'une colonne a son bitmap compacté (un bit par
+    ligne). Les valeurs choisies dans une colonne se combinent par OU, les
+    colonnes entre elles par ET ; les lignes ne sont extraites qu'une fois,
+    à la fin.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.size = len(df)
+        self._values = {}
+        self._lookup = {}
+        self._na_code = {}
+        self._codes = {}
+        self._bitmaps = {}
+        for column in columns:
+            if column not in df.columns:
+                continue
+            # Valeurs dans l'ordre d'apparition, comme Series.unique()
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+            values = list(uniques)
+            self._values[column] = values
+            self._lookup[column] = {value: code for code, value in enumerate(values) if not pd.isna(value)}
+            self._na_code[column] = next((code for code, value in enumerate(values) if pd.isna(value)), None)
+            self._codes[column] = codes.astype(np.int32)
+            self._bitmaps[column] = _bitmaps(self._codes[column], len(values))
+
+    def patched(self, change):
+        """Index du jeu de données modifié (voir data_cache.FrameChange).
+
+        Seules les lignes touchées sont lues : leurs codes sont remplacés et
+        leurs bits déplacés. Une suppression décale les lignes suivantes : les
+        bitmaps sont alors recalculés à partir des codes, sans refactoriser.
+        """
+        index = FilterIndex.__new__(FilterIndex)
+        index.size = len(change.after)
+        index._values, index._lookup, index._na_code = {}, {}, {}
+        index._codes, index._bitmaps = {}, {}
+        written = change.written
+        for column in self._values:
+            values = list(self._values[column])
+            lookup = dict(self._lookup[column])
+            na_code = self._na_code[column]
+            new_codes = []
+            for value in change.after[column].iloc[written]:
+                code = na_code if pd.isna(value) else lookup.get(value)
+                if code is None:
+                    # Nouvelle valeur : code suivant, comme l'ordre d'apparition de factorize
+                    code = len(values)
+                    values.append(value)
+                    if pd.isna(value):
+                        na_code = code
+                    else:
+                        lookup[value] = code
+                new_codes.append(code)
+            new_codes = np.array(new_codes, dtype=np.int32)
+
+            codes = self._codes[column]
+            if len(change.removed):
+                codes = np.delete(codes, change.removed)
+                bitmaps = _bitmaps(codes, len(values))
+            else:
+                old_codes = codes[change.updated]
+                codes = np.concatenate([codes, np.zeros(len(change.added), dtype=np.int32)])
+                codes[written] = new_codes
+                bitmaps = self._bitmaps[column]
+                width = (index.size + 7) // 8
+                bitmaps = np.pad(bitmaps, ((0, len(values) - bitmaps.shape[0]), (0, width - bitmaps.shape[1])))
+                _set_bits(bitmaps, old_codes, change.updated, False)
+                _set_bits(bitmaps, new_codes, written, True)
+            index._values[column] = values
+            index._lookup[column] = lookup
+            index._na_code[column] = na_code
+            index._codes[column] = codes
+            index._bitmaps[column] = bitmaps
+        return index
+
+    def __contains__(self, column):
+        return column in self._values
+
+    def counts(self, column, rows=None):
+        """Nombre de lignes par valeur (parmi `rows` si fourni), sans les valeurs absentes"""
+        codes = self._codes[column] if rows is None else self._codes[column][rows]
+        counts = np.bincount(codes, minlength=len(self._values[column]))
+        return {value: int(count) for value, count in zip(self._values[column], counts) if count}
+
+    def _code(self, column, value):
+        if pd.isna(value):
+            return self._na_code[column]
+        return self._lookup[column].get(value)
+
+    def mask(self, filters):
+        """Bitmap compacté des lignes retenues par `filters` ({colonne: valeurs})"""
+        mask = np.full((self.size + 7) // 8, 0xFF, dtype=np.uint8)
+        for column, values in filters.items():
+            if not values or column not in self:
+                continue
+            codes = [code for code in (self._code(column, value) for value in values) if code is not None]
+            if not codes:
+                return np.zeros_like(mask)
+            mask &= np.bitwise_or.reduce(self._bitmaps[column][codes], axis=0)
+        return mask
+
+    def select(self, filters, rows=None):
+        """Positions des lignes retenues, dans l'ordre de `rows` s'il est fourni"""
+        selected = np.unpackbits(self.mask(filters), count=self.size).astype(bool)
+        if rows is None:
+            return np.flatnonzero(selected)
+        return rows[selected[rows]]
@@ -1,8 +1,38 @@
+import argparse
 import pandas as pd
 import mysql.connector
 from datetime import datetime
+from openpyxl import load_workbook
 import os
 
+from normalization import normalize_genres
+
+EXCEL_FILE = "Feuille de Recensement des Ivoiriens Résidents en Sibérie.xlsx"
+
+# Renommer les colonnes pour correspondre à la base de données
+COLUMN_MAPPING = {
+    '15': 'date_inscription',
+    'Adresse e-mail ': 'email',
+    'Nom': 'nom_complet',
+    'Genre': 'genre',
+    'Université': 'universite',
+    'Faculté': 'faculte',
+    "Niveau d'étude": 'niveau_etude',
+    'Numéro de téléphone ': 'telephone',
+    'Adresse de résidence': 'adresse',
+    'Ville': 'ville'
+}
+
+TEXT_COLUMNS = ['email', 'nom_complet', 'universite', 'faculte',
+                'niveau_etude', 'telephone', 'adresse', 'ville']
+
+INSERT_QUERY = """
+INSERT INTO etudiants
+(date_inscription, email, nom_complet, genre, universite, faculte,
+ niveau_etude, telephone, adresse, ville)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
 def connect_to_database():
     try:
         connection = mysql.connector.connect(
@@ -15,105 +45,102 @@ def connect_to_database():
         print(f"Erreur de connexion: {err}")
         return None
 
-def normalize_genre(genre):
-    genre = str(genre).strip().lower()
-    if genre in ['m', 'masculin', 'homme', 'h']:
-        return 'Homme'
-    elif genre in ['f', 'feminin', 'féminin', 'femme']:
-        return 'Femme'
-    else:
-        return 'Autre'
+def iter_excel_chunks(excel_file, batch_size):
+    """Lit le classeur en mode lecture seule et renvoie des DataFrames de `batch_size` lignes"""
+    workbook = load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows)]
+        chunk = []
+        for row in rows:
+            # Ignorer les lignes entièrement vides, comme pd.read_excel
+            if all(cell is None for cell in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= batch_size:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+def normalize_chunk(df):
+    """Renomme et normalise un bloc de lignes en une seule passe par colonne"""
+    df = df.rename(columns=COLUMN_MAPPING)
+    # Les cellules vides deviennent 'nan', comme avec pd.read_excel
+    df = df.fillna(float('nan'))
+    df['genre'] = normalize_genres(df['genre'])
+    for column in TEXT_COLUMNS:
+        df[column] = df[column].astype(str).str.strip()
+    # Utiliser la date actuelle si la colonne '15' n'est pas une date
+    df['date_inscription'] = datetime.now().date()
+    return df[['date_inscription', 'email', 'nom_complet', 'genre', 'universite', 'faculte',
+               'niveau_etude', 'telephone', 'adresse', 'ville']]
+
+def insert_chunk(connection, cursor, df, first_line):
+    """Insère un bloc avec executemany ; en cas d'erreur, reprend ligne par ligne"""
+    values = list(df.itertuples(index=False, name=None))
+    try:
+        cursor.executemany(INSERT_QUERY, values)
+        connection.commit()
+        return len(values)
+    except mysql.connector.Error as e:
+        connection.rollback()
+        print(f"Erreur sur le bloc commençant à la ligne {first_line} ({e}), insertion ligne par ligne...")
+
+    successful_inserts = 0
+    for offset, row in enumerate(values):
+        try:
+            cursor.execute(INSERT_QUERY, row)
+            successful_inserts += 1
+        except mysql.connector.Error as e:
+            print(f"Erreur lors de l'insertion de la ligne {first_line + offset}: {e}")
+    connection.commit()
+    return successful_inserts
 
-def import_excel_to_mysql():
+def import_excel_to_mysql(excel_file=EXCEL_FILE, batch_size=1000, log_every=10000):
     try:
-        # Chemin du fichier Excel
-        excel_file = "Feuille de Recensement des Ivoiriens Résidents en Sibérie.xlsx"
-        
         # Vérifier si le fichier existe
         if not os.path.exists(excel_file):
             print(f"Erreur: Le fichier {excel_file} n'existe pas dans le dossier actuel.")
             return False
-        
-        # Lire le fichier Excel
-        print(f"Lecture du fichier {excel_file}...")
-        df = pd.read_excel(excel_file)
-        
-        # Renommer les colonnes pour correspondre à la base de données
-        column_mapping = {
-            '15': 'date_inscription',
-            'Adresse e-mail ': 'email',
-            'Nom': 'nom_complet',
-            'Genre': 'genre',
-            'Université': 'universite',
-            'Faculté': 'faculte',
-            "Niveau d'étude": 'niveau_etude',
-            'Numéro de téléphone ': 'telephone',
-            'Adresse de résidence': 'adresse',
-            'Ville': 'ville'
-        }
-        
-        # Renommer les colonnes
-        df = df.rename(columns=column_mapping)
-        
-        # Normaliser les valeurs de genre
-        df['genre'] = df['genre'].apply(normalize_genre)
-        
+
         # Se connecter à la base de données
-        print("\nConnexion à la base de données...")
+        print("Connexion à la base de données...")
         connection = connect_to_database()
         if not connection:
             return False
-        
+
         cursor = connection.cursor()
-        
-        # Préparer la requête d'insertion
-        insert_query = """
-        INSERT INTO etudiants 
-        (date_inscription, email, nom_complet, genre, universite, faculte, 
-         niveau_etude, telephone, adresse, ville)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        # Convertir les données et les insérer
-        print("\nInsertion des données...")
+
+        # Lire le fichier par blocs et insérer chaque bloc dans sa propre transaction
+        print(f"Lecture et insertion du fichier {excel_file} par blocs de {batch_size} lignes...")
         successful_inserts = 0
-        for index, row in df.iterrows():
-            try:
-                # Convertir la date si nécessaire
-                date_inscription = datetime.now().date()  # Utiliser la date actuelle si la colonne '15' n'est pas une date
-                
-                # Préparer les valeurs
-                values = (
-                    date_inscription,
-                    str(row['email']).strip(),
-                    str(row['nom_complet']).strip(),
-                    row['genre'],  # Déjà normalisé
-                    str(row['universite']).strip(),
-                    str(row['faculte']).strip(),
-                    str(row['niveau_etude']).strip(),
-                    str(row['telephone']).strip(),
-                    str(row['adresse']).strip(),
-                    str(row['ville']).strip()
-                )
-                
-                cursor.execute(insert_query, values)
-                successful_inserts += 1
-                print(f"Ligne {index + 1} insérée avec succès")
-                
-            except Exception as e:
-                print(f"Erreur lors de l'insertion de la ligne {index + 1}: {e}")
-                continue
-        
-        # Valider les changements
-        connection.commit()
-        print(f"\nImport terminé avec succès. {successful_inserts} lignes insérées sur {len(df)} lignes traitées.")
-        
+        processed = 0
+        next_log = log_every
+        for chunk in iter_excel_chunks(excel_file, batch_size):
+            chunk = normalize_chunk(chunk)
+            successful_inserts += insert_chunk(connection, cursor, chunk, processed + 1)
+            processed += len(chunk)
+            if processed >= next_log:
+                print(f"{processed} lignes traitées, {successful_inserts} insérées")
+                next_log += log_every
+
+        print(f"\nImport terminé avec succès. {successful_inserts} lignes insérées sur {processed} lignes traitées.")
+        return True
+
     except Exception as e:
         print(f"Erreur lors de l'import: {e}")
         return False
     finally:
-        if 'connection' in locals():
+        if 'connection' in locals() and connection:
             connection.close()
 
 if __name__ == "__main__":
-    import_excel_to_mysql() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Importe le fichier Excel du recensement dans MySQL")
+    parser.add_argument("--file", default=EXCEL_FILE, help="Chemin du fichier Excel")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Nombre de lignes par bloc inséré")
+    parser.add_argument("--log-every", type=int, default=10000, help="Intervalle (en lignes) entre deux messages de progression")
+    args = parser.parse_args()
+    import_excel_to_mysql(args.file, args.batch_size, args.log_every)
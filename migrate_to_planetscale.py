@@ -1,7 +1,15 @@
+import argparse
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import mysql.connector
 from dotenv import load_dotenv
-import pandas as pd
+
+# Fichier de reprise : dernier id migré pour chaque plage
+CHECKPOINT_FILE = ".migration_checkpoint.json"
 
 def connect_to_database(host, user, password, database, ssl_mode=None):
     try:
@@ -25,57 +33,185 @@ def connect_to_database(host, user, password, database, ssl_mode=None):
         print(f"Erreur de connexion: {err}")
         return None
 
-def migrate_data():
-    # Charger les variables d'environnement
-    load_dotenv()
-    
-    # Connexion à la base locale
-    local_conn = connect_to_database(
+def connect_local():
+    return connect_to_database(
         host="localhost",
         user="root",
         password=os.getenv("MYSQL_PASSWORD"),
         database="cirt_db"
     )
-    
-    # Connexion à PlanetScale
-    planetscale_conn = connect_to_database(
+
+def connect_planetscale():
+    return connect_to_database(
         host=os.getenv("MYSQL_HOST"),
         user=os.getenv("MYSQL_USER"),
         password=os.getenv("MYSQL_PASSWORD"),
         database=os.getenv("MYSQL_DATABASE"),
         ssl_mode=os.getenv("MYSQL_SSL_MODE")
     )
-    
+
+class Checkpoint:
+    """Plages d'id à migrer et dernier id migré pour chacune, sauvegardés sur disque"""
+
+    def __init__(self, path, ranges):
+        self.path = path
+        self.ranges = ranges
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return cls(path, json.load(f)['ranges'])
+
+    def update(self, index, last_id):
+        with self._lock:
+            self.ranges[index]['last_id'] = last_id
+            # Écriture atomique pour ne jamais laisser un fichier tronqué
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'ranges': self.ranges}, f)
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def split_id_ranges(min_id, max_id, workers):
+    """Découpe [min_id, max_id] en `workers` plages disjointes"""
+    step = max(1, (max_id - min_id + workers) // workers)
+    ranges = []
+    start = min_id - 1
+    while start < max_id:
+        end = min(start + step, max_id)
+        # last_id : dernier id migré, les lignes de la plage vérifient last_id < id <= end
+        ranges.append({'last_id': start, 'end': end})
+        start = end
+    return ranges
+
+def build_insert_query(columns, row_count):
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    # ON DUPLICATE KEY : relancer un lot déjà copié (avant sa sauvegarde) ne provoque pas d'erreur.
+    # Les lignes ignorées ne comptent pas dans rowcount : voir skipped_rows
+    return (
+        f"INSERT INTO etudiants ({', '.join(columns)}) VALUES "
+        + ", ".join([placeholders] * row_count)
+        + " ON DUPLICATE KEY UPDATE id = id"
+    )
+
+def skipped_rows(cursor, columns, rows):
+    """Lignes d'un lot non insérées qui ne sont pas déjà sur la cible (même id, même email) :
+    conflits sur une autre clé unique, comme un email déjà utilisé par un autre id"""
+    id_index, email_index = columns.index('id'), columns.index('email')
+    cursor.execute(
+        f"SELECT id, email FROM etudiants WHERE id IN ({', '.join(['%s'] * len(rows))})",
+        [row[id_index] for row in rows]
+    )
+    copied = set(cursor.fetchall())
+    return [row for row in rows if (row[id_index], row[email_index]) not in copied]
+
+def migrate_range(checkpoint, index, batch_size):
+    """Copie une plage d'id par lots ; renvoie (lignes migrées, lignes en conflit)"""
+    id_range = checkpoint.ranges[index]
+    local_conn = connect_local()
+    planetscale_conn = connect_planetscale() if local_conn else None
     if not local_conn or not planetscale_conn:
-        return
-    
+        if local_conn:
+            local_conn.close()
+        raise RuntimeError("Connexion impossible pour la plage "
+                           f"{id_range['last_id'] + 1}-{id_range['end']}")
+
+    migrated = 0
+    conflicts = []
     try:
-        # Récupérer les données de la base locale
-        local_cursor = local_conn.cursor(dictionary=True)
-        local_cursor.execute("SELECT * FROM etudiants")
-        data = local_cursor.fetchall()
-        
-        # Insérer les données dans PlanetScale
+        # Curseur non bufferisé : les lignes sont lues au fur et à mesure côté serveur
+        local_cursor = local_conn.cursor(buffered=False)
+        local_cursor.execute(
+            "SELECT * FROM etudiants WHERE id > %s AND id <= %s ORDER BY id",
+            (id_range['last_id'], id_range['end'])
+        )
+        columns = list(local_cursor.column_names)
+        id_index = columns.index('id')
         planetscale_cursor = planetscale_conn.cursor()
-        
-        for row in data:
-            # Préparer la requête d'insertion
-            columns = ', '.join(row.keys())
-            values = ', '.join(['%s'] * len(row))
-            query = f"INSERT INTO etudiants ({columns}) VALUES ({values})"
-            
-            # Exécuter l'insertion
-            planetscale_cursor.execute(query, list(row.values()))
-        
-        # Valider les changements
-        planetscale_conn.commit()
-        print("Migration terminée avec succès!")
-        
-    except mysql.connector.Error as err:
-        print(f"Erreur lors de la migration: {err}")
+
+        while True:
+            rows = local_cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            query = build_insert_query(columns, len(rows))
+            planetscale_cursor.execute(query, [value for row in rows for value in row])
+            skipped = []
+            if planetscale_cursor.rowcount < len(rows):
+                # Lignes ignorées : un lot rejoué après une interruption, ou un conflit
+                skipped = skipped_rows(planetscale_cursor, columns, rows)
+            planetscale_conn.commit()
+            checkpoint.update(index, rows[-1][id_index])
+            migrated += len(rows) - len(skipped)
+            conflicts.extend(skipped)
+        return migrated, conflicts
     finally:
         local_conn.close()
         planetscale_conn.close()
 
+def migrate_data(batch_size=1000, workers=1, checkpoint_path=CHECKPOINT_FILE, restart=False):
+    # Charger les variables d'environnement
+    load_dotenv()
+
+    checkpoint = None if restart else Checkpoint.load(checkpoint_path)
+    if checkpoint:
+        print(f"Reprise de la migration depuis {checkpoint_path}")
+    else:
+        local_conn = connect_local()
+        if not local_conn:
+            return
+        try:
+            cursor = local_conn.cursor()
+            cursor.execute("SELECT MIN(id), MAX(id) FROM etudiants")
+            min_id, max_id = cursor.fetchone()
+        finally:
+            local_conn.close()
+        if min_id is None:
+            print("Aucune donnée à migrer.")
+            return
+        checkpoint = Checkpoint(checkpoint_path, split_id_ranges(min_id, max_id, workers))
+
+    start_time = time.perf_counter()
+    migrated = 0
+    conflicts = []
+    failed = False
+    with ThreadPoolExecutor(max_workers=len(checkpoint.ranges)) as executor:
+        futures = [executor.submit(migrate_range, checkpoint, index, batch_size)
+                   for index in range(len(checkpoint.ranges))]
+        for future in futures:
+            try:
+                range_migrated, range_conflicts = future.result()
+                migrated += range_migrated
+                conflicts.extend(range_conflicts)
+            except (mysql.connector.Error, RuntimeError) as err:
+                print(f"Erreur lors de la migration: {err}")
+                failed = True
+    elapsed = time.perf_counter() - start_time
+
+    rate = migrated / elapsed if elapsed > 0 else 0
+    print(f"{migrated} lignes migrées en {elapsed:.1f} s ({rate:.0f} lignes/s)")
+    if conflicts:
+        print(f"Erreur : {len(conflicts)} lignes non migrées, en conflit avec une ligne déjà présente "
+              "sur PlanetScale (email déjà utilisé par un autre id) :")
+        for row in conflicts:
+            print(f"  {row}")
+    if failed:
+        print(f"Migration incomplète : relancez le script pour reprendre depuis {checkpoint_path}")
+    else:
+        checkpoint.remove()
+        if not conflicts:
+            print("Migration terminée avec succès!")
+
 if __name__ == "__main__":
-    migrate_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Migre la table etudiants de la base locale vers PlanetScale")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Nombre de lignes par insertion")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de connexions en parallèle")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="Fichier de reprise")
+    parser.add_argument("--restart", action="store_true", help="Ignorer le fichier de reprise existant")
+    args = parser.parse_args()
+    migrate_data(args.batch_size, args.workers, args.checkpoint, args.restart)
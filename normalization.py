@@ -0,0 +1,176 @@
+import pandas as pd
+
+# Normalisation des données du recensement, partagée par app.py, app_flask.py et import_data.py.
+# Les tables de correspondance sont construites une seule fois ; les fonctions sur
+# les colonnes ne normalisent que les valeurs distinctes puis les redistribuent
+# sur toutes les lignes.
+
+# Genre : correspondance exacte après suppression des espaces et du point final,
+# sans tenir compte de la casse. Toute autre valeur (vide, inconnue) devient 'Autre'.
+GENRE_DEFAULT = 'Autre'
+GENRE_MAPPING = {
+    **dict.fromkeys(['m', 'h', 'homme', 'male', 'masculin', 'man'], 'Homme'),
+    **dict.fromkeys(['f', 'femme', 'female', 'feminin', 'féminin', 'woman', 'w'], 'Femme'),
+    'autre': 'Autre'
+}
+
+UNIVERSITY_ABBREVIATIONS = {
+    "Université Polytechnique de Tomsk": "ТПУ",
+    "Université d'Etat de Tomsk": "ТГУ",
+    "Université d'Etat de Tomsk des Systemes de Controle et de Radioelectronique": "ТУСУР",
+    "Université d'Etat de Tomsk des Systèmes de Contrôle et de Radioélectronique": "ТУСУР",
+    "Université Médicale d'Etat de Sibérie": "СибГМУ",
+    "Université Médicale d'Etat de Novossibirsk": "НГМУ",
+    "Université d'Etat de Novossibirsk d'Economie et de Gestion": "НГУЭУ",
+    "Université d'État de Novossibirsk d'Économie et de Gestion": "НГУЭУ",
+    "Université d'Etat de Novossibirsk d'économie et de gestion": "НГУЭУ",
+    "Université d'Etat de Novossibirsk": "НГУЭУ",
+    "Université de Novossibirsk d'Economie et de Gestion": "НГУЭУ",
+    "НГУЭУ": "НГУЭУ",
+    "Université d'Etat d'Architecture et de Construction de Tomsk": "ТГАСУ",
+    "Université Médicale d'Etat de Kemerovo": "КемГМУ",
+    "Universite d'Etat de Tomsk": "ТГУ",
+    "Université d'État de Tomsk": "ТГУ",
+    "Université médicale d'Etat de Sibérie": "СибГМУ",
+    "Université d'Etat architecture construction Tomsk": "ТГАСУ",
+    "Tomsk State University": "ТГУ",
+    "Siberian State Medical University": "СибГМУ",
+    "Tomsk University of Control Systems and Radioelectronics": "ТУСУР"
+}
+# Recherche insensible à la casse ; la première entrée l'emporte en cas de doublon
+_UNIVERSITY_LOOKUP = {}
+for _full_name, _abbrev in UNIVERSITY_ABBREVIATIONS.items():
+    _UNIVERSITY_LOOKUP.setdefault(_full_name.lower(), _abbrev)
+UNKNOWN_UNIVERSITY = "Inconnu"
+
+CITY_MAPPING = {
+    'Tomsk': 'Tomsk',
+    'Tomks': 'Tomsk',
+    'Tomsk ': 'Tomsk',
+    'Tomsk City': 'Tomsk',
+    'Tomskaya Oblast': 'Tomsk',
+    'Kemerovo': 'Kemerovo',
+    'Kemerovo ': 'Kemerovo',
+    'Kemerovo City': 'Kemerovo',
+    'Томск': 'Tomsk',
+    'Kemerovskaya Oblast': 'Kemerovo'
+}
+
+NIVEAU_MAPPING = {
+    'Master': 'Master',
+    'Master ': 'Master',
+    'Masters': 'Master',
+    'M2': 'Master',
+    'M1': 'Master',
+    'Bachelor': 'Bachelor',
+    'Licence': 'Bachelor',
+    'Doctorat': 'Doctorat',
+    'PhD': 'Doctorat',
+    'Spécialiste': 'Spécialiste',
+    'Année de langue': 'Année de langue'
+}
+
+# Motifs (expressions régulières) appliqués aux noms de facultés
+FACULTE_MAPPING = {
+    'économie': 'Économie',
+    'economie': 'Économie',
+    'Économie': 'Économie',
+    'Economie': 'Économie',
+    'Faculty of Economics': 'Économie',
+    'Faculté d\'économie': 'Économie',
+    'médecine': 'Médecine',
+    'medecine': 'Médecine',
+    'Médecine': 'Médecine',
+    'Medecine': 'Médecine',
+    'médical': 'Médecine',
+    'medical': 'Médecine',
+    'Faculty of Medicine': 'Médecine',
+    'informatique': 'Informatique',
+    'Informatique': 'Informatique',
+    'Computer Science': 'Informatique',
+    'IT': 'Informatique',
+    'ingénierie': 'Ingénierie',
+    'ingenierie': 'Ingénierie',
+    'Ingénierie': 'Ingénierie',
+    'Ingenierie': 'Ingénierie',
+    'Engineering': 'Ingénierie',
+    'droit': 'Droit',
+    'Droit': 'Droit',
+    'Law': 'Droit'
+}
+
+def map_unique_values(series, normalize):
+    """Applique `normalize` (Series -> Series) aux seules valeurs distinctes de `series`"""
+    codes, uniques = pd.factorize(series)
+    normalized = normalize(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    result = pd.Series(normalized[codes], index=series.index, name=series.name, dtype=object)
+    # factorize confond None et NaN : les valeurs manquantes sont normalisées telles quelles
+    missing = codes == -1
+    if missing.any():
+        result[missing] = normalize(series[missing].astype(object)).to_numpy(dtype=object)
+    return result
+
+def _normalize_genre_values(values):
+    keys = values.where(values.notna(), '').astype(str).str.strip().str.rstrip('.').str.lower()
+    return keys.map(GENRE_MAPPING).fillna(GENRE_DEFAULT)
+
+def normalize_genres(series):
+    """Normalise une colonne de genres en 'Homme', 'Femme' ou 'Autre'"""
+    return map_unique_values(series, _normalize_genre_values)
+
+def normalize_genre(genre):
+    return normalize_genres(pd.Series([genre])).iloc[0]
+
+def _abbreviate_university_values(values):
+    missing = values.isna() | (values == "")
+    names = values.where(~missing, "").astype(str).str.strip()
+    lowered = names.str.lower()
+    abbreviations = lowered.map(_UNIVERSITY_LOOKUP)
+    # Toute variante contenant "Novossibirsk" et "Économie" désigne l'НГУЭУ
+    is_nsuem = lowered.str.contains('novossibirsk', regex=False) & (
+        lowered.str.contains('economie', regex=False) | lowered.str.contains('économie', regex=False)
+    )
+    abbreviations = abbreviations.mask(abbreviations.isna() & is_nsuem, "НГУЭУ")
+    # Sans correspondance, le nom (sans espaces superflus) est conservé
+    abbreviations = abbreviations.fillna(names)
+    return abbreviations.mask(missing, UNKNOWN_UNIVERSITY)
+
+def abbreviate_universities(series):
+    """Remplace les noms d'universités par leur abréviation russe ('Inconnu' si vide)"""
+    return map_unique_values(series, _abbreviate_university_values)
+
+def abbreviate_university(name):
+    return abbreviate_universities(pd.Series([name])).iloc[0]
+
+def _normalize_city_values(values):
+    cities = values.astype(str).str.strip().str.title().replace(CITY_MAPPING)
+    # Standardisation finale - tout ce qui contient 'Tomsk' devient 'Tomsk'
+    cities = cities.mask(cities.str.contains('Tomsk', case=False, na=False), 'Tomsk')
+    return cities.mask(cities.str.contains('Kemerovo', case=False, na=False), 'Kemerovo')
+
+def _normalize_niveau_values(values):
+    return values.astype(str).str.strip().replace(NIVEAU_MAPPING)
+
+def _normalize_faculte_values(values):
+    # Les valeurs manquantes restent manquantes
+    present = values.notna()
+    result = values.astype(object).copy()
+    if present.any():
+        result[present] = values[present].str.strip().replace(FACULTE_MAPPING, regex=True)
+    return result
+
+def normalize_facultes(series):
+    """Regroupe les variantes de noms de facultés (Économie, Médecine, ...)"""
+    return map_unique_values(series, _normalize_faculte_values)
+
+def clean_data(df):
+    """Nettoie et uniformise toutes les données"""
+    # Nettoyage des villes
+    if 'ville' in df.columns:
+        df['ville'] = map_unique_values(df['ville'], _normalize_city_values)
+
+    # Nettoyage des niveaux d'étude
+    if 'niveau_etude' in df.columns:
+        df['niveau_etude'] = map_unique_values(df['niveau_etude'], _normalize_niveau_values)
+
+    return df
@@ -0,0 +1,52 @@
+import hashlib
+
+import pandas as pd
+
+# Rapprochement d'une feuille importée avec la base, par email.
+# Chaque ligne est résumée par une empreinte de ses champs normalisés ; les
+# empreintes de la base sont recalculées à partir des lignes lues, sans
+# colonne supplémentaire dans le schéma.
+
+HASH_FIELDS = ['nom_complet', 'genre', 'universite', 'faculte', 'niveau_etude',
+               'telephone', 'adresse', 'ville']
+_SEPARATOR = '\x1f'
+
+def _normalized_fields(df):
+    # Valeurs manquantes et chaînes vides sont équivalentes, espaces ignorés
+    fields = []
+    for column in HASH_FIELDS:
+        values = df[column] if column in df.columns else pd.Series('', index=df.index)
+        values = values.astype(object)
+        fields.append(values.where(values.notna(), '').astype(str).str.strip())
+    return fields
+
+def frame_hashes(df):
+    """Empreinte (hexadécimale) des champs de HASH_FIELDS pour chaque ligne de `df`"""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    fields = _normalized_fields(df)
+    joined = fields[0].str.cat(fields[1:], sep=_SEPARATOR)
+    return joined.map(lambda text: hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest())
+
+def hashes_by_email(df):
+    """{email: empreinte} pour des lignes lues en base"""
+    return dict(zip(df['email'], frame_hashes(df)))
+
+def reconcile(incoming, existing_hashes):
+    """Classe les lignes de `incoming` (une par email) par rapport aux empreintes en base.
+
+    Renvoie un dict : 'new' et 'changed' (DataFrames à écrire), 'unchanged'
+    (nombre de lignes identiques) et 'missing' (emails en base absents de
+    `incoming`).
+    """
+    hashes = frame_hashes(incoming)
+    stored = incoming['email'].map(existing_hashes)
+    is_new = stored.isna()
+    is_changed = ~is_new & (stored != hashes)
+    missing = set(existing_hashes) - set(incoming['email'])
+    return {
+        'new': incoming[is_new],
+        'changed': incoming[is_changed],
+        'unchanged': int((~is_new & ~is_changed).sum()),
+        'missing': sorted(missing)
+    }
@@ -16,7 +16,12 @@ CREATE TABLE IF NOT EXISTS etudiants (
     adresse TEXT NOT NULL,
     ville VARCHAR(100) NOT NULL,
     date_creation TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    date_modification TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    date_modification TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    -- Index pour les filtres de /api/etudiants
+    INDEX idx_etudiants_genre (genre),
+    INDEX idx_etudiants_ville (ville),
+    INDEX idx_etudiants_universite (universite),
+    INDEX idx_etudiants_niveau_etude (niveau_etude)
 );
 
 -- Table des utilisateurs
@@ -50,4 +55,11 @@ CREATE TABLE IF NOT EXISTS commentaires (
     utilisateur_id INT,
     FOREIGN KEY (incident_id) REFERENCES incidents(id),
     FOREIGN KEY (utilisateur_id) REFERENCES utilisateurs(id)
-); 
\ No newline at end of file
+);
+
+-- Base créée avant l'ajout des index ci-dessus (à exécuter une seule fois) :
+-- ALTER TABLE etudiants
+--     ADD INDEX idx_etudiants_genre (genre),
+--     ADD INDEX idx_etudiants_ville (ville),
+--     ADD INDEX idx_etudiants_universite (universite),
+--     ADD INDEX idx_etudiants_niveau_etude (niveau_etude);
@@ -0,0 +1,175 @@
+import re
+import unicodedata
+from functools import reduce
+
+import numpy as np
+
+# Translittération simplifiée du cyrillique vers l'alphabet latin
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'j',
+    'з': 'z', 'и': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o',
+    'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'ou', 'ф': 'f', 'х': 'kh', 'ц': 'ts',
+    'ч': 'tch', 'ш': 'ch', 'щ': 'ch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'iou',
+    'я': 'ia'
+}
+_TRANSLITERATION = str.maketrans(CYRILLIC_TO_LATIN)
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+# Taille des n-grammes et part minimale des n-grammes de la requête à retrouver.
+# Pour une requête courte, le seuil descend jusqu'à MIN_FUZZY_SCORE : une faute
+# de frappe y fait manquer une plus grande part des n-grammes.
+NGRAM_SIZE = 3
+MIN_SCORE = 0.75
+MIN_FUZZY_SCORE = 0.5
+
+def normalize_text(text):
+    """Minuscules, sans accents, translittéré en latin, mots séparés par une espace"""
+    text = str(text).lower().translate(_TRANSLITERATION)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', text).strip()
+
+def ngrams(text, partial_last_word=False):
+    """N-grammes des mots de `text`, bornés par des espaces.
+
+    Pour une requête en cours de saisie, le dernier mot peut être incomplet :
+    on ne lui ajoute alors pas d'espace final.
+    """
+    words = text.split()
+    grams = set()
+    for position, word in enumerate(words):
+        last = partial_last_word and position == len(words) - 1
+        padded = f" {word}" if last else f" {word} "
+        if len(padded) < NGRAM_SIZE:
+            grams.add(padded)
+        for start in range(len(padded) - NGRAM_SIZE + 1):
+            grams.add(padded[start:start + NGRAM_SIZE])
+    return grams
+
+def inner_ngrams(text):
+    """N-grammes intérieurs aux mots de `text`, sans espace : tout texte qui contient `text` les contient"""
+    return {word[start:start + NGRAM_SIZE] for word in text.split() for start in range(len(word) - NGRAM_SIZE + 1)}
+
+def fuzzy_threshold(count, min_score=MIN_SCORE):
+    """Score minimal d'une requête de `count` n-grammes : une faute de frappe en fait manquer jusqu'à NGRAM_SIZE"""
+    return min(min_score, max(MIN_FUZZY_SCORE, (count - NGRAM_SIZE) / count))
+
+def _scores_of(rows, candidates, scores):
+    # Score de chaque ligne de `rows` parmi des candidats triés (0 si absente)
+    if not len(candidates):
+        return np.zeros(len(rows))
+    found = np.searchsorted(candidates, rows).clip(max=len(candidates) - 1)
+    return np.where(candidates[found] == rows, scores[found], 0.0)
+
+class SearchIndex:
+    """Index inversé de n-grammes sur les noms (et éventuellement les emails).
+
+    Une ligne correspond si elle contient la requête (comme str.contains, au
+    milieu d'un mot compris) ou si elle partage assez de n-grammes avec elle :
+    la recherche tolère les accents, le cyrillique et les fautes de frappe.
+    Seules les listes de lignes des n-grammes de la requête sont parcourues.
+    """
+
+    def __init__(self, df, include_email=False):
+        self.include_email = include_email
+        self.size = len(df)
+        self.texts = self._texts(df)
+
+        postings = {}
+        for position, text in enumerate(self.texts):
+            for gram in ngrams(text):
+                postings.setdefault(gram, []).append(position)
+        self._postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def _texts(self, df):
+        texts = df['nom_complet'].fillna('').astype(str)
+        if self.include_email and 'email' in df.columns:
+            # Seule la partie avant @ est utile à la recherche
+            texts = texts + ' ' + df['email'].fillna('').astype(str).str.split('@').str[0]
+        return [normalize_text(text) for text in texts]
+
+    def patched(self, change):
+        """Index du jeu de données modifié (voir data_cache.FrameChange).
+
+        Seuls les textes des lignes touchées sont normalisés, et seules les
+        listes de leurs n-grammes anciens ou nouveaux sont modifiées. Une
+        suppression renumérote les listes sans renormaliser les textes.
+        """
+        index = SearchIndex.__new__(SearchIndex)
+        index.include_email = self.include_email
+        index.size = len(change.after)
+        postings = dict(self._postings)
+        if len(change.removed):
+            positions = change.new_positions()
+            index.texts = [text for text, position in zip(self.texts, positions) if position >= 0]
+            for gram, rows in self._postings.items():
+                rows = positions[rows]
+                rows = rows[rows >= 0]
+                if len(rows):
+                    postings[gram] = rows.astype(np.int32)
+                else:
+                    del postings[gram]
+            index._postings = postings
+            return index
+
+        texts = self.texts + [''] * len(change.added)
+        removed, added = {}, {}
+        written = change.written.tolist()
+        for position, text in zip(written, self._texts(change.after.iloc[written])):
+            old_grams, new_grams = ngrams(texts[position]), ngrams(text)
+            for gram in old_grams - new_grams:
+                removed.setdefault(gram, []).append(position)
+            for gram in new_grams - old_grams:
+                added.setdefault(gram, []).append(position)
+            texts[position] = text
+        for gram, rows in removed.items():
+            kept = postings[gram][~np.isin(postings[gram], rows)]
+            if len(kept):
+                postings[gram] = kept
+            else:
+                del postings[gram]
+        for gram, rows in added.items():
+            postings[gram] = np.concatenate([postings.get(gram, np.array([], dtype=np.int32)),
+                                             np.array(rows, dtype=np.int32)])
+        index.texts = texts
+        index._postings = postings
+        return index
+
+    def _substring_matches(self, query):
+        """Lignes dont le texte contient `query`"""
+        grams = inner_ngrams(query)
+        if grams:
+            # Les n-grammes intérieurs des mots sont indexés : seules les lignes qui les ont tous sont vérifiées
+            if any(gram not in self._postings for gram in grams):
+                return np.array([], dtype=np.int32)
+            candidates = reduce(np.intersect1d, (self._postings[gram] for gram in grams))
+        else:
+            # Mots de moins de NGRAM_SIZE lettres : parcours de tous les textes
+            candidates = range(self.size)
+        return np.array([position for position in candidates if query in self.texts[position]], dtype=np.int32)
+
+    def _fuzzy_matches(self, grams, min_score):
+        """(lignes partageant un n-gramme avec `grams`, leurs scores, lignes atteignant le seuil)"""
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            empty = np.array([], dtype=np.int32)
+            return empty, np.array([]), empty
+        candidates, shared = np.unique(np.concatenate(lists), return_counts=True)
+        scores = shared / len(grams)
+        return candidates, scores, candidates[scores >= fuzzy_threshold(len(grams), min_score)]
+
+    def search(self, query, limit=None, min_score=MIN_SCORE):
+        """Renvoie les positions des lignes correspondantes, de la plus à la moins pertinente"""
+        query = normalize_text(query)
+        if not query:
+            return np.arange(self.size)
+        exact = self._substring_matches(query)
+        # Dernier mot de la requête en cours de saisie (préfixe) ou complet : le meilleur score est gardé
+        partial = self._fuzzy_matches(ngrams(query, partial_last_word=True), min_score)
+        complete = self._fuzzy_matches(ngrams(query), min_score)
+        candidates = reduce(np.union1d, (exact, partial[2], complete[2]))
+        scores = np.maximum(_scores_of(candidates, *partial[:2]), _scores_of(candidates, *complete[:2]))
+        # Une sous-chaîne exacte passe devant, puis le score décroissant
+        order = np.lexsort((-scores, ~np.isin(candidates, exact)))
+        results = candidates[order].astype(np.int32)
+        return results[:limit] if limit is not None else results
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+# Lecture de la feuille des réponses au formulaire de recensement.
+# Les identifiants sont non interactifs (compte de service ou jeton enregistré)
+# et l'import peut ne récupérer que les lignes ajoutées depuis le dernier passage.
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
+SPREADSHEET_ID = os.getenv("SPREADSHEET_ID", "11ucmdeReXYeAD4phDTJSyq_5ELnADZlUQpDZhH43Gk8")
+# Colonnes lues dans la feuille (A à J)
+FIRST_COLUMN = "A"
+LAST_COLUMN = "J"
+# Jeton OAuth enregistré par `python sheets_source.py --authorize`
+TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", "token.json")
+CLIENT_SECRETS_FILE = os.getenv("GOOGLE_SHEETS_CREDENTIALS", "credentials.json")
+# Dernière ligne importée, par feuille
+STATE_FILE = os.getenv("SHEETS_STATE_FILE", ".sheets_import_state.json")
+
+def load_credentials(service_account_info=None, token_file=TOKEN_FILE):
+    """Identifiants Google sans interaction : compte de service, sinon jeton enregistré.
+
+    `service_account_info` est un dict ou sa forme JSON (chaîne), comme dans
+    .streamlit/secrets.toml.
+    """
+    if service_account_info:
+        try:
+            if isinstance(service_account_info, str):
+                service_account_info = json.loads(service_account_info)
+            return service_account.Credentials.from_service_account_info(dict(service_account_info), scopes=SCOPES)
+        except (ValueError, TypeError, KeyError) as e:
+            if not os.path.exists(token_file):
+                raise RuntimeError(f"Compte de service Google invalide : {e}") from e
+            # Compte de service mal configuré : le jeton enregistré prend le relais
+            print(f"Compte de service Google invalide ({e}), utilisation de {token_file}")
+
+    if not os.path.exists(token_file):
+        raise RuntimeError(
+            f"Aucun identifiant Google : configurez un compte de service ou lancez "
+            f"'python sheets_source.py --authorize' pour créer {token_file}"
+        )
+    creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+    if not creds.valid:
+        if not (creds.expired and creds.refresh_token):
+            raise RuntimeError(f"Le jeton {token_file} n'est plus valide, relancez l'autorisation")
+        creds.refresh(Request())
+        # Le jeton rafraîchi est réenregistré pour les prochains imports
+        with open(token_file, 'w') as token:
+            token.write(creds.to_json())
+    return creds
+
+class SheetsSource:
+    """Interface de lecture d'une feuille : en-tête et lignes à partir d'un numéro de ligne"""
+
+    def header(self):
+        raise NotImplementedError
+
+    def rows(self, start_row):
+        """Lignes à partir de `start_row` (numérotation de la feuille, en-tête en ligne 1)"""
+        raise NotImplementedError
+
+class GoogleSheetsSource(SheetsSource):
+    def __init__(self, credentials, spreadsheet_id=SPREADSHEET_ID):
+        self.spreadsheet_id = spreadsheet_id
+        self._values = build('sheets', 'v4', credentials=credentials, cache_discovery=False).spreadsheets().values()
+
+    def _get(self, cell_range):
+        result = self._values.get(spreadsheetId=self.spreadsheet_id, range=cell_range).execute()
+        return result.get('values', [])
+
+    def header(self):
+        values = self._get(f"{FIRST_COLUMN}1:{LAST_COLUMN}1")
+        return values[0] if values else []
+
+    def rows(self, start_row):
+        return self._get(f"{FIRST_COLUMN}{start_row}:{LAST_COLUMN}")
+
+class StaticSheetsSource(SheetsSource):
+    """Feuille en mémoire (liste de lignes, en-tête compris), pour les essais sans Google"""
+
+    def __init__(self, values, spreadsheet_id="local"):
+        self.spreadsheet_id = spreadsheet_id
+        self.values = values
+
+    def header(self):
+        return self.values[0] if self.values else []
+
+    def rows(self, start_row):
+        return self.values[start_row - 1:]
+
+class ImportState:
+    """Prochaine ligne à importer pour chaque feuille, sauvegardée sur disque"""
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.sheets = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.sheets = json.load(f)
+
+    def get(self, spreadsheet_id):
+        return self.sheets.get(spreadsheet_id)
+
+    def save(self, spreadsheet_id, header, next_row):
+        self.sheets[spreadsheet_id] = {'header': header, 'next_row': next_row}
+        # Écriture atomique pour ne jamais laisser un fichier tronqué
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.sheets, f)
+        os.replace(tmp_path, self.path)
+
+def fetch_rows(source, state=None, incremental=True):
+    """Renvoie (en-tête, lignes, prochaine ligne à importer).
+
+    En mode incrémental, seules les lignes ajoutées depuis le dernier import
+    sont lues. On relit toute la feuille si aucun import n'a été enregistré
+    ou si l'en-tête a changé (colonnes déplacées, autre feuille).
+    """
+    header = source.header()
+    saved = state.get(source.spreadsheet_id) if state is not None else None
+    start_row = 2
+    if incremental and saved and saved.get('header') == header:
+        start_row = saved['next_row']
+    rows = source.rows(start_row) if header else []
+    # L'API omet les cellules vides en fin de ligne
+    rows = [row + [None] * (len(header) - len(row)) for row in rows]
+    return header, rows, start_row + len(rows)
+
+def authorize(client_secrets_file=CLIENT_SECRETS_FILE, token_file=TOKEN_FILE):
+    """Autorisation OAuth interactive, à faire une seule fois : enregistre le jeton"""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    flow = InstalledAppFlow.from_client_secrets_file(client_secrets_file, SCOPES)
+    creds = flow.run_local_server(port=0)
+    with open(token_file, 'w') as token:
+        token.write(creds.to_json())
+    print(f"Jeton enregistré dans {token_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accès à la feuille Google Sheets du recensement")
+    parser.add_argument("--authorize", action="store_true", help="Créer le jeton OAuth (interactif, une seule fois)")
+    parser.add_argument("--reset", action="store_true", help="Oublier la dernière ligne importée")
+    args = parser.parse_args()
+    if args.authorize:
+        authorize()
+    if args.reset and os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+        print(f"{STATE_FILE} supprimé : le prochain import relira toute la feuille")
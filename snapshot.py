@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import time
+
+# Instantané local (Parquet) de la table etudiants nettoyée, écrit par app.py.
+# Il permet de servir les pages dès le démarrage, avant toute requête à la base,
+# et il est lisible par visualize_data.py et par l'application Flask.
+# pyarrow n'est importé qu'à la lecture ou à l'écriture d'un instantané.
+
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "etudiants_snapshot.parquet")
+# Incrémenté si le contenu de l'instantané change de forme : les anciens sont ignorés
+SNAPSHOT_FORMAT = 1
+_METADATA_KEY = b'etudiants_snapshot'
+
+def save_snapshot(df, path=SNAPSHOT_PATH, version=None):
+    """Écrit `df` dans `path` (écriture atomique) avec sa date et sa version"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_METADATA_KEY] = json.dumps({
+        'format': SNAPSHOT_FORMAT,
+        'saved_at': time.time(),
+        'version': version
+    }).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+    # Fichier temporaire propre à cette écriture, dans le même dossier (os.replace
+    # reste atomique) : plusieurs processus peuvent écrire le même instantané
+    directory, name = os.path.split(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=f"{name}.", suffix='.tmp', delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Renvoie (DataFrame, informations) ; (None, None) si l'instantané est absent ou illisible"""
+    if not path or not os.path.exists(path):
+        return None, None
+    import pyarrow.parquet as pq
+
+    try:
+        # memory_map évite un tampon de lecture intermédiaire, mais to_pandas()
+        # copie tout de même les colonnes en mémoire : le cache a besoin d'un
+        # DataFrame pandas, et la table tient largement en mémoire
+        table = pq.read_table(path, memory_map=True)
+        info = json.loads((table.schema.metadata or {}).get(_METADATA_KEY, b'{}'))
+        if info.get('format') != SNAPSHOT_FORMAT:
+            return None, None
+        return table.to_pandas(), info
+    except Exception as e:
+        print(f"Instantané {path} illisible: {e}")
+        return None, None
@@ -0,0 +1,71 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from postgrest.exceptions import APIError
+
+# Écritures Supabase (PostgREST) en parallèle, avec nouvelles tentatives.
+# Le client supabase partage un seul client httpx, utilisable depuis plusieurs threads.
+
+# Nombre maximal de requêtes d'écriture simultanées
+WRITE_CONCURRENCY = int(os.getenv("SUPABASE_WRITE_CONCURRENCY", "4"))
+# Nouvelles tentatives après une erreur transitoire, délais en secondes
+WRITE_MAX_RETRIES = int(os.getenv("SUPABASE_WRITE_RETRIES", "4"))
+RETRY_BASE_DELAY = float(os.getenv("SUPABASE_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("SUPABASE_RETRY_MAX_DELAY", "8"))
+
+# Statuts HTTP et codes PostgREST / PostgreSQL qui valent la peine d'être réessayés
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+RETRYABLE_CODES = {
+    'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003',  # connexion à la base, pool saturé
+    '40001', '40P01',  # échec de sérialisation, interblocage
+    '53300', '57P01', '57P03'  # trop de connexions, serveur en redémarrage
+}
+
+def is_retryable(error):
+    """Erreur transitoire (réseau, surcharge) plutôt qu'un rejet des données"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        code = str(error.code) if error.code is not None else ""
+        return code in RETRYABLE_CODES or (code.isdigit() and int(code) in RETRYABLE_STATUS)
+    return False
+
+def backoff_delay(attempt, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Délai avant la tentative `attempt` + 1 : exponentiel, tiré au hasard (« full jitter »)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def run_with_retry(operation, max_retries=WRITE_MAX_RETRIES, base_delay=RETRY_BASE_DELAY,
+                   max_delay=RETRY_MAX_DELAY, sleep=time.sleep):
+    """Exécute `operation()` ; renvoie (résultat, nombre de tentatives) ou lève la dernière erreur"""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return operation(), attempt
+        except Exception as e:
+            if attempt > max_retries or not is_retryable(e):
+                e.attempts = attempt
+                raise
+            sleep(backoff_delay(attempt - 1, base_delay, max_delay))
+
+def write_batches(write, batches, concurrency=WRITE_CONCURRENCY, max_retries=WRITE_MAX_RETRIES,
+                  base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+    """Applique `write(batch)` à chaque lot, au plus `concurrency` à la fois.
+
+    Renvoie, dans l'ordre des lots, un dict par lot : 'attempts' (nombre de
+    tentatives) et 'error' (None si le lot a été écrit).
+    """
+    def run(batch):
+        try:
+            _, attempts = run_with_retry(lambda: write(batch), max_retries, base_delay, max_delay)
+            return {'attempts': attempts, 'error': None}
+        except Exception as e:
+            return {'attempts': getattr(e, 'attempts', 1), 'error': e}
+
+    if not batches:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as executor:
+        return list(executor.map(run, batches))
@@ -0,0 +1,164 @@
+import threading
+import time
+
+import pandas as pd
+
+import aggregates
+from data_cache import DatasetCache, RecordIndex, compact_frame, drop_known_rows, merge_rows, upsert_rows
+from filter_index import FilterIndex
+from search_index import SearchIndex
+
+def etudiants(*rows):
+    return compact_frame(pd.DataFrame([
+        {'id': student_id, 'nom_complet': nom, 'ville': ville, 'universite': 'TSU'}
+        for student_id, nom, ville in rows
+    ]))
+
+def etudiant(student_id, nom, **fields):
+    row = {'id': student_id, 'nom_complet': nom, 'email': f"{student_id}@x", 'genre': 'Femme',
+           'universite': 'Université d\'État de Tomsk', 'faculte': 'Informatique',
+           'niveau_etude': 'Master', 'ville': 'Tomsk', 'statut': 'Étudiant actuel',
+           'date_modification': '2025-01-01T00:00:00+00:00'}
+    row.update(fields)
+    return row
+
+def census():
+    return compact_frame(pd.DataFrame([
+        etudiant(1, 'KONÉ Aya'),
+        etudiant(2, 'KOUASSI Ange', genre='Homme', ville='Kemerovo'),
+        etudiant(3, 'TRAORÉ Moussa', genre='Homme', niveau_etude='Bachelor', faculte=None),
+        etudiant(4, 'KOFFI Jean', genre='Homme', universite='Université polytechnique de Tomsk')
+    ]))
+
+def test_upsert_keeps_categories_sorted_for_sorting():
+    df = etudiants((1, 'KONÉ Aya', 'Tomsk'), (2, 'YAO Paul', 'Kemerovo'))
+    out, _ = upsert_rows(df, etudiants((3, 'KOFFI Jean', 'Barnaoul')))
+    assert list(out['ville'].cat.categories) == ['Barnaoul', 'Kemerovo', 'Tomsk']
+    assert out.sort_values('ville')['ville'].tolist() == ['Barnaoul', 'Kemerovo', 'Tomsk']
+
+def test_upsert_replaces_known_rows_in_place_and_appends_new_ones():
+    df = etudiants((1, 'KONÉ Aya', 'Tomsk'), (2, 'YAO Paul', 'Kemerovo'))
+    out, change = upsert_rows(df, etudiants((1, 'KONÉ Aya', 'Omsk'), (3, 'KOFFI Jean', 'Tomsk')))
+    assert out['id'].tolist() == [1, 2, 3]
+    assert out['ville'].tolist() == ['Omsk', 'Kemerovo', 'Tomsk']
+    assert isinstance(out['ville'].dtype, pd.CategoricalDtype)
+    assert change.updated.tolist() == [0] and change.added.tolist() == [2]
+    # Le DataFrame d'origine, encore servi aux autres sessions, n'est pas modifié
+    assert df['ville'].tolist() == ['Tomsk', 'Kemerovo']
+
+def test_upsert_with_duplicate_keys_falls_back_to_merge():
+    df = etudiants((1, 'KONÉ Aya', 'Tomsk'), (1, 'KONÉ Aya', 'Omsk'), (2, 'YAO Paul', 'Tomsk'))
+    out, change = upsert_rows(df, etudiants((1, 'KONÉ Aya', 'Kemerovo')))
+    assert out['ville'].tolist() == ['Tomsk', 'Kemerovo']
+    assert change is None
+
+def test_merge_rows_replaces_by_key():
+    df = pd.DataFrame({'email': ['a@x', 'b@x'], 'ville': ['Tomsk', 'Omsk']})
+    out = merge_rows(df, pd.DataFrame({'email': ['b@x', 'c@x'], 'ville': ['Kemerovo', 'Tomsk']}))
+    assert sorted(zip(out['email'], out['ville'])) == [('a@x', 'Tomsk'), ('b@x', 'Kemerovo'), ('c@x', 'Tomsk')]
+
+def test_drop_known_rows_keeps_only_rows_modified_since_cache():
+    df = compact_frame(pd.DataFrame([etudiant(1, 'KONÉ Aya'), etudiant(2, 'YAO Paul')]))
+    changes = pd.DataFrame([
+        etudiant(1, 'KONÉ Aya'),
+        etudiant(2, 'YAO Paul', date_modification='2025-02-01T00:00:00+00:00'),
+        etudiant(3, 'KOFFI Jean')
+    ])
+    assert drop_known_rows(df, changes)['id'].tolist() == [2, 3]
+
+def test_patch_without_data_or_rows_asks_for_a_reload():
+    cache = DatasetCache(census)
+    assert not cache.patch([etudiant(5, 'YAO Paul')])
+    cache.get()
+    assert not cache.patch([], [])
+
+def cube_cells(cube):
+    cells = cube.astype(object).where(cube.notna(), None)
+    return sorted(map(tuple, cells.values.tolist()), key=repr)
+
+def derived_structures(cache, builders):
+    cache.get()
+    return {name: cache.derived(name, build, update=update) for name, (build, update) in builders.items()}
+
+def assert_same_as_rebuild(structures, df):
+    records = RecordIndex(df)
+    for position, (student_id, email) in enumerate(zip(df['id'], df['email'])):
+        assert structures['record_index'].by_id(student_id) == records.by_id(student_id) == position
+        assert structures['record_index'].by_email(email) == position
+
+    filters = FilterIndex(df)
+    for selection in ({}, {'genre': ['Homme']}, {'ville': ['Omsk', 'Tomsk'], 'niveau_etude': ['Master']}):
+        assert structures['filter_index'].select(selection).tolist() == filters.select(selection).tolist()
+    for column in ('genre', 'ville', 'universite', 'statut'):
+        assert structures['filter_index'].counts(column) == filters.counts(column)
+
+    search = SearchIndex(df, include_email=True)
+    for query in ('kone', 'assi', 'kofi', 'yao', 'moussa'):
+        assert sorted(structures['search_index'].search(query)) == sorted(search.search(query))
+
+    assert cube_cells(structures['cube']) == cube_cells(aggregates.build_cube(df))
+
+def test_patch_updates_derived_structures_without_rebuilding_them():
+    builds = []
+
+    def counted(builder):
+        def build(df):
+            builds.append(builder)
+            return builder(df)
+        return build
+
+    builders = {
+        'record_index': (counted(RecordIndex), RecordIndex.patched),
+        'filter_index': (counted(FilterIndex), FilterIndex.patched),
+        'search_index': (counted(lambda df: SearchIndex(df, include_email=True)), SearchIndex.patched),
+        'cube': (counted(aggregates.build_cube), aggregates.patch_cube)
+    }
+    cache = DatasetCache(census)
+    derived_structures(cache, builders)
+    version = cache.version
+
+    # Modification (nouvelle ville, nouveau nom) et ajout
+    assert cache.patch([
+        etudiant(2, 'KOUASSI Ange Junior', genre='Homme', ville='Omsk'),
+        etudiant(5, 'YAO Paul', genre='Homme', niveau_etude='Doctorat', email='paul.yao@x')
+    ])
+    assert cache.version == version + 1
+    df = cache.get()
+    assert df['id'].tolist() == [1, 2, 3, 4, 5]
+    assert_same_as_rebuild(derived_structures(cache, builders), df)
+
+    # Suppression : les lignes suivantes changent de position
+    assert cache.patch(deleted=[{'id': 1}])
+    df = cache.get()
+    assert df['id'].tolist() == [2, 3, 4, 5]
+    assert_same_as_rebuild(derived_structures(cache, builders), df)
+    assert len(builds) == len(builders)
+
+def test_load_started_before_invalidate_does_not_satisfy_waiter():
+    avant = etudiants((1, 'KONÉ Aya', 'Tomsk'))
+    apres = etudiants((1, 'KONÉ Aya', 'Omsk'))
+    frames = iter([avant, apres])
+    started, release = threading.Event(), threading.Event()
+
+    def loader():
+        df = next(frames)
+        if df is avant:
+            # Rechargement en arrière-plan en cours pendant l'écriture
+            started.set()
+            release.wait(5)
+        return df
+
+    cache = DatasetCache(loader)
+    refresher = threading.Thread(target=cache.refresh)
+    refresher.start()
+    started.wait(5)
+    cache.invalidate(full=True)
+    result = {}
+    waiter = threading.Thread(target=lambda: result.setdefault('df', cache.get()))
+    waiter.start()
+    time.sleep(0.05)
+    release.set()
+    refresher.join()
+    waiter.join()
+    assert result['df']['ville'].tolist() == ['Omsk']
+    assert not cache.is_stale()
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from reconcile import frame_hashes, hashes_by_email, reconcile
+
+def etudiant(email, **fields):
+    row = {'email': email, 'nom_complet': 'KONÉ Aya', 'genre': 'Femme', 'universite': 'TSU',
+           'faculte': 'Informatique', 'niveau_etude': 'Master', 'telephone': '+7 900',
+           'adresse': 'ул. Ленина 1', 'ville': 'Tomsk'}
+    row.update(fields)
+    return row
+
+def test_classifies_new_changed_unchanged_and_missing():
+    existing = hashes_by_email(pd.DataFrame([
+        etudiant('a@x'), etudiant('b@x'), etudiant('c@x')
+    ]))
+    incoming = pd.DataFrame([
+        etudiant('a@x'),
+        etudiant('b@x', ville='Kemerovo'),
+        etudiant('d@x')
+    ])
+    changes = reconcile(incoming, existing)
+    assert changes['new']['email'].tolist() == ['d@x']
+    assert changes['changed']['email'].tolist() == ['b@x']
+    assert changes['unchanged'] == 1
+    assert changes['missing'] == ['c@x']
+
+def test_missing_values_and_whitespace_do_not_count_as_changes():
+    stored = pd.DataFrame([etudiant('a@x', faculte=None, adresse='ул. Ленина 1')])
+    incoming = pd.DataFrame([etudiant('a@x', faculte='', adresse='  ул. Ленина 1 ')])
+    changes = reconcile(incoming, hashes_by_email(stored))
+    assert changes['unchanged'] == 1
+    assert changes['changed'].empty
+
+def test_hash_ignores_columns_outside_hash_fields():
+    first = pd.DataFrame([etudiant('a@x', date_modification='2025-01-01')])
+    second = pd.DataFrame([etudiant('a@x', date_modification='2025-06-01', statut='Ancien étudiant')])
+    assert frame_hashes(first).tolist() == frame_hashes(second).tolist()
+
+def test_empty_sheet_reports_every_stored_email_missing():
+    existing = hashes_by_email(pd.DataFrame([etudiant('a@x')]))
+    incoming = pd.DataFrame(columns=list(etudiant('z@x')))
+    changes = reconcile(incoming, existing)
+    assert changes['new'].empty and changes['changed'].empty
+    assert changes['unchanged'] == 0
+    assert changes['missing'] == ['a@x']
@@ -0,0 +1,35 @@
+import pandas as pd
+
+from search_index import SearchIndex
+
+NOMS = ['KOUASSI Ange', 'TRAORÉ Moussa', 'KOFFI Jean', 'KONÉ Aya', 'KOUAMÉ Yao', 'Дьяло Ибраим']
+
+def found(query, noms=NOMS):
+    index = SearchIndex(pd.DataFrame({'nom_complet': noms}))
+    return [noms[position] for position in index.search(query)]
+
+def test_empty_query_returns_every_row():
+    assert found('  ') == NOMS
+
+def test_mid_word_substrings_match_like_str_contains():
+    assert found('assi') == ['KOUASSI Ange']
+    assert found('ore') == ['TRAORÉ Moussa']
+
+def test_accents_and_cyrillic_are_ignored():
+    assert found('traore') == ['TRAORÉ Moussa']
+    assert found('kone aya') == ['KONÉ Aya']
+    assert 'Дьяло Ибраим' in found('ibraim')
+
+def test_typos_are_tolerated():
+    assert found('kofi') == ['KOFFI Jean']
+    assert found('kuassi') == ['KOUASSI Ange']
+
+def test_prefix_while_typing():
+    assert found('kou')[:2] == ['KOUASSI Ange', 'KOUAMÉ Yao']
+
+def test_exact_substring_ranks_before_approximate_matches():
+    results = found('koua')
+    assert set(results[:2]) == {'KOUASSI Ange', 'KOUAMÉ Yao'}
+
+def test_unrelated_query_finds_nothing():
+    assert found('zzzz') == []
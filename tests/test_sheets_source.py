@@ -0,0 +1,77 @@
+import json
+
+from sheets_source import ImportState, StaticSheetsSource, fetch_rows
+
+HEADER = ["Date", "Nom", "Ville"]
+
+def make_source(*rows, header=HEADER):
+    return StaticSheetsSource([list(header)] + [list(row) for row in rows])
+
+def test_first_import_reads_whole_sheet(tmp_path):
+    source = make_source(["01/09/2024", "Koné", "Tomsk"], ["02/09/2024", "Yao", "Omsk"])
+    header, rows, next_row = fetch_rows(source, ImportState(tmp_path / "state.json"))
+    assert header == HEADER
+    assert rows == [["01/09/2024", "Koné", "Tomsk"], ["02/09/2024", "Yao", "Omsk"]]
+    # En-tête en ligne 1, deux réponses : prochaine ligne 4
+    assert next_row == 4
+
+def test_incremental_import_resumes_after_saved_row(tmp_path):
+    state = ImportState(tmp_path / "state.json")
+    source = make_source(["01/09/2024", "Koné", "Tomsk"])
+    header, _, next_row = fetch_rows(source, state)
+    state.save(source.spreadsheet_id, header, next_row)
+
+    source.values.append(["03/09/2024", "Bamba", "Kemerovo"])
+    _, rows, next_row = fetch_rows(source, ImportState(tmp_path / "state.json"))
+    assert rows == [["03/09/2024", "Bamba", "Kemerovo"]]
+    assert next_row == 4
+
+def test_no_new_rows(tmp_path):
+    state = ImportState(tmp_path / "state.json")
+    source = make_source(["01/09/2024", "Koné", "Tomsk"])
+    header, _, next_row = fetch_rows(source, state)
+    state.save(source.spreadsheet_id, header, next_row)
+
+    _, rows, again = fetch_rows(source, state)
+    assert rows == []
+    assert again == next_row
+
+def test_header_change_forces_full_read(tmp_path):
+    state = ImportState(tmp_path / "state.json")
+    state.save("local", HEADER, 3)
+    source = make_source(["01/09/2024", "Tomsk", "Koné"], header=["Date", "Ville", "Nom"])
+    _, rows, next_row = fetch_rows(source, state)
+    assert rows == [["01/09/2024", "Tomsk", "Koné"]]
+    assert next_row == 3
+
+def test_full_read_when_not_incremental(tmp_path):
+    state = ImportState(tmp_path / "state.json")
+    state.save("local", HEADER, 3)
+    source = make_source(["01/09/2024", "Koné", "Tomsk"], ["02/09/2024", "Yao", "Omsk"])
+    _, rows, _ = fetch_rows(source, state, incremental=False)
+    assert len(rows) == 2
+
+def test_short_rows_are_padded():
+    # L'API Sheets omet les cellules vides en fin de ligne
+    source = make_source(["01/09/2024", "Koné"], ["02/09/2024"])
+    _, rows, _ = fetch_rows(source)
+    assert rows == [["01/09/2024", "Koné", None], ["02/09/2024", None, None]]
+
+def test_empty_sheet():
+    header, rows, next_row = fetch_rows(StaticSheetsSource([]))
+    assert header == []
+    assert rows == []
+    assert next_row == 2
+
+def test_state_is_saved_per_sheet(tmp_path):
+    path = tmp_path / "state.json"
+    state = ImportState(path)
+    state.save("feuille-a", HEADER, 10)
+    state.save("feuille-b", ["Nom"], 3)
+
+    assert json.loads(path.read_text()) == {
+        "feuille-a": {"header": HEADER, "next_row": 10},
+        "feuille-b": {"header": ["Nom"], "next_row": 3}
+    }
+    assert ImportState(path).get("feuille-a") == {"header": HEADER, "next_row": 10}
+    assert not (tmp_path / "state.json.tmp").exists()
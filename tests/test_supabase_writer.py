@@ -0,0 +1,69 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from supabase_writer import backoff_delay, is_retryable, run_with_retry, write_batches
+
+def api_error(code):
+    return APIError({'message': 'erreur', 'code': code, 'hint': None, 'details': None})
+
+def failing(errors, result="ok"):
+    """Opération qui lève les erreurs de `errors` une à une, puis renvoie `result`"""
+    errors = list(errors)
+
+    def operation():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return operation
+
+def test_retryable_errors():
+    assert is_retryable(httpx.ConnectError("refusé"))
+    assert is_retryable(api_error('503'))
+    assert is_retryable(api_error('PGRST001'))
+    assert is_retryable(api_error('40P01'))
+    assert not is_retryable(api_error('23505'))  # violation d'unicité
+    assert not is_retryable(api_error('400'))
+    assert not is_retryable(ValueError("données invalides"))
+
+def test_retries_transient_errors_then_succeeds():
+    delays = []
+    operation = failing([api_error('503'), httpx.ReadTimeout("lent")])
+    result, attempts = run_with_retry(operation, max_retries=4, base_delay=0.5, sleep=delays.append)
+    assert (result, attempts) == ("ok", 3)
+    assert len(delays) == 2
+    # Délais tirés entre 0 et base_delay * 2 ** tentative
+    assert 0 <= delays[0] <= 0.5 and 0 <= delays[1] <= 1.0
+
+def test_gives_up_after_max_retries():
+    delays = []
+    operation = failing([api_error('503')] * 5)
+    with pytest.raises(APIError) as info:
+        run_with_retry(operation, max_retries=2, sleep=delays.append)
+    assert info.value.attempts == 3
+    assert len(delays) == 2
+
+def test_does_not_retry_rejected_data():
+    delays = []
+    with pytest.raises(APIError) as info:
+        run_with_retry(failing([api_error('23505')]), sleep=delays.append)
+    assert info.value.attempts == 1
+    assert delays == []
+
+def test_backoff_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base_delay=0.5, max_delay=2) <= 2
+
+def test_write_batches_reports_each_batch_in_order():
+    written = []
+
+    def write(batch):
+        if batch == ['rejeté']:
+            raise api_error('23505')
+        written.extend(batch)
+
+    results = write_batches(write, [['a'], ['rejeté'], ['b', 'c']], concurrency=3, base_delay=0)
+    assert [result['error'] is None for result in results] == [True, False, True]
+    assert [result['attempts'] for result in results] == [1, 1, 1]
+    assert sorted(written) == ['a', 'b', 'c']
+    assert write_batches(write, []) == []
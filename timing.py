@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# Mesure des étapes d'une exécution (chargement, filtres, figures...).
+# L'exécution en cours est propre au thread : Streamlit exécute chaque session
+# dans son propre thread, le rechargement en arrière-plan dans le sien.
+# span() ne coûte presque rien hors d'une exécution mesurée.
+
+_current = threading.local()
+
+class Run:
+    def __init__(self, label):
+        self.label = label
+        self.started_at = datetime.now()
+        self.total = None
+        # Durée cumulée par étape, dans l'ordre de première apparition
+        self.spans = {}
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+class RunLog:
+    """Les `max_runs` dernières exécutions, partagées entre threads"""
+
+    def __init__(self, max_runs=20):
+        self._runs = deque(maxlen=max_runs)
+        self._lock = threading.Lock()
+
+    def append(self, run):
+        with self._lock:
+            self._runs.append(run)
+
+    def runs(self):
+        """Exécutions terminées, de la plus récente à la plus ancienne"""
+        with self._lock:
+            return list(reversed(self._runs))
+
+@contextmanager
+def record_run(log, label):
+    """Mesure une exécution et l'ajoute à `log` ; imbriquée dans une autre, ses étapes s'ajoutent à celle-ci"""
+    run = getattr(_current, 'run', None)
+    if run is not None:
+        yield run
+        return
+    run = Run(label)
+    _current.run = run
+    start = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run.total = time.perf_counter() - start
+        _current.run = None
+        log.append(run)
+
+def set_label(label):
+    """Renomme l'exécution en cours (par exemple une fois la page connue)"""
+    run = getattr(_current, 'run', None)
+    if run is not None:
+        run.label = label
+
+@contextmanager
+def span(name):
+    """Ajoute la durée du bloc à l'étape `name` de l'exécution en cours"""
+    run = getattr(_current, 'run', None)
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.add(name, time.perf_counter() - start)
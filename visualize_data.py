@@ -1,6 +1,9 @@
+import argparse
 import mysql.connector
 from tabulate import tabulate
 
+from snapshot import SNAPSHOT_PATH, load_snapshot
+
 def connect_to_database():
     try:
         connection = mysql.connector.connect(
@@ -34,5 +37,21 @@ def display_students():
         finally:
             connection.close()
 
+def display_snapshot(path=SNAPSHOT_PATH):
+    """Affiche les étudiants de l'instantané Parquet écrit par app.py, sans base de données"""
+    df, info = load_snapshot(path)
+    if df is None:
+        print(f"Aucun instantané lisible: {path}")
+        return
+    print(f"\nListe des étudiants (instantané, version {info.get('version')}):")
+    print(tabulate(df, headers='keys', tablefmt="grid", showindex=False))
+
 if __name__ == "__main__":
-    display_students() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Affiche la table des étudiants")
+    parser.add_argument("--snapshot", nargs="?", const=SNAPSHOT_PATH,
+                        help="Lire l'instantané Parquet local plutôt que MySQL (chemin facultatif)")
+    args = parser.parse_args()
+    if args.snapshot:
+        display_snapshot(args.snapshot)
+    else:
+        display_students()